@@ -0,0 +1,142 @@
+"""
+Headless batch evaluation of calculator expressions, one per line.
+
+    python calc_batch.py expressions.txt                     # CSV to stdout
+    python calc_batch.py expressions.txt -o results.csv --workers 8
+    cat audit.log | python calc_batch.py - --jsonl
+
+Every line is typed through the calculators' keypad logic (calc_keys.replay)
+and then "=" is pressed, so the result is what the Streamlit calculators
+would show: ÷ × − ＋ (or + - * /) as typed, "%" divides the expression so far
+by 100, "±" toggles its sign, over-budget expressions run in an isolated
+worker and report "Too expensive". Output rows are
+line,expression,result,status with status ok / error / too_expensive / empty.
+
+Lines are read lazily and sent to a process pool in batches of --batch lines.
+At most --in-flight batches are queued at a time, so memory stays bounded for
+any input size, and results are written as soon as the oldest batch is done,
+in input order.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from calc_engine import TOO_EXPENSIVE
+from calc_engine import calculate as calculate_in_process
+from calc_keys import replay
+from calc_sandbox import calculate as calculate_isolated
+
+BATCH_SIZE = 1000
+
+
+def evaluate_lines(lines, isolate: bool = True) -> list:
+    """[(result, status)] for a batch of display strings; runs in the pool workers."""
+    calculate = calculate_isolated if isolate else calculate_in_process
+    out = []
+    for text in lines:
+        if not text.strip():
+            out.append(("", "empty"))
+            continue
+        result = replay(text, calculate=calculate)
+        if result == "Error":
+            status = "error"
+        elif result == TOO_EXPENSIVE:
+            status = "too_expensive"
+        else:
+            status = "ok"
+        out.append((result, status))
+    return out
+
+
+def read_batches(stream, size: int):
+    lines = (line.rstrip("\r\n") for line in stream)
+    while True:
+        batch = list(islice(lines, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ordered_results(batches, workers: int, in_flight: int, isolate: bool):
+    """(lines, results) per batch in input order, with at most `in_flight` batches pending."""
+    if workers <= 1:
+        for batch in batches:
+            yield batch, evaluate_lines(batch, isolate)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            if len(pending) >= in_flight:
+                lines, future = pending.popleft()
+                yield lines, future.result()
+            pending.append((batch, pool.submit(evaluate_lines, batch, isolate)))
+        while pending:
+            lines, future = pending.popleft()
+            yield lines, future.result()
+
+
+class Writer:
+    """CSV or JSON lines output, flushed after every batch."""
+
+    def __init__(self, stream, jsonl: bool):
+        self.stream = stream
+        self.jsonl = jsonl
+        if not jsonl:
+            self.csv = csv.writer(stream)
+            self.csv.writerow(["line", "expression", "result", "status"])
+
+    def write(self, first_line: int, lines, results):
+        for i, (text, (result, status)) in enumerate(zip(lines, results), start=first_line):
+            if self.jsonl:
+                self.stream.write(json.dumps({"line": i, "expression": text, "result": result,
+                                              "status": status}, ensure_ascii=False) + "\n")
+            else:
+                self.csv.writerow([i, text, result, status])
+        self.stream.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a file of calculator expressions, one per line")
+    parser.add_argument("input", help="expression file, or - for stdin")
+    parser.add_argument("-o", "--output", help="result file (default: stdout)")
+    parser.add_argument("--jsonl", action="store_true", help="JSON lines instead of CSV")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="pool processes (1 = no pool)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="lines per task")
+    parser.add_argument("--in-flight", type=int, default=None, help="queued batches (default: 2 x workers)")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="report over-budget expressions as too expensive instead of retrying them in a worker")
+    args = parser.parse_args()
+    in_flight = args.in_flight or 2 * max(args.workers, 1)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8", newline="")
+    writer = Writer(target, args.jsonl)
+    counts = {"ok": 0, "error": 0, "too_expensive": 0, "empty": 0}
+    line_no = 1
+    t0 = time.perf_counter()
+    try:
+        batches = read_batches(source, args.batch)
+        for lines, results in ordered_results(batches, args.workers, in_flight, not args.no_isolate):
+            writer.write(line_no, lines, results)
+            line_no += len(lines)
+            for _, status in results:
+                counts[status] += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    seconds = time.perf_counter() - t0
+    total = line_no - 1
+    print(f"{total:,} lines in {seconds:.2f} s ({total / max(seconds, 1e-9):,.0f} lines/s): "
+          + ", ".join(f"{n:,} {k}" for k, n in counts.items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Microbenchmark: calc_engine against the old str.replace + eval path of the calculators.
+
+    python calc_benchmark.py                # 20,000 expressions
+    python calc_benchmark.py --n 100000
+
+First checks that both paths show the same result for every generated display
+string, then times: the old path, the engine on a cold cache (tokenize + parse
++ compile + evaluate) and the engine on a warm cache (evaluate only). Last,
+the cost of one keystroke of the live preview against re-evaluating the whole
+display, for growing expression lengths, and array mode against an eval per value.
+"""
+import argparse
+import random
+import time
+import warnings
+
+import calc_array
+import calc_engine
+from calc_preview import LivePreview
+
+# The old apps' replacement table (calculator.py / calculator_final.py)
+symbol_map = {"÷": "/", "×": "*", "−": "-", " ＋ ": "+", "＋": "+"}
+
+DISPLAY_OPS = ["÷", "×", "−", " ＋ "]
+
+
+def old_calculate(expr: str) -> str:
+    try:
+        for k, v in symbol_map.items():
+            expr = expr.replace(k, v)
+        return str(eval(expr))
+    except Exception:
+        return "Error"
+
+
+def random_number(rng) -> str:
+    if rng.random() < 0.05:
+        # A result that "=" put back on the display in exponent form: 2.5e+20, 1e-05
+        return str(rng.choice([1.0, rng.uniform(1, 10)]) * 10.0 ** rng.choice([-9, -5, 16, 20, 30]))
+    whole = str(rng.choice([rng.randint(0, 9), rng.randint(10, 999), rng.randint(1000, 10**6)]))
+    return whole + (f".{rng.randint(0, 999)}" if rng.random() < 0.3 else "")
+
+
+def random_expression(rng, depth: int = 0) -> str:
+    """A well-formed display string like the keypad builds."""
+    parts = [random_number(rng)]
+    for _ in range(rng.randint(0, 4)):
+        operand = (f"({random_expression(rng, depth + 1)})"
+                   if depth < 2 and rng.random() < 0.2 else random_number(rng))
+        parts += [rng.choice(DISPLAY_OPS), operand]
+    expr = "".join(parts)
+    return "-" + expr if rng.random() < 0.1 else expr
+
+
+def random_keypresses(rng) -> str:
+    """Arbitrary key sequences, mostly malformed (×× collapsed: huge powers would swamp the timings)."""
+    keys = list("0123456789.()") + DISPLAY_OPS
+    expr = "".join(rng.choice(keys) for _ in range(rng.randint(1, 12)))
+    return expr.replace("××", "×")
+
+
+def corpus(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [random_expression(rng) if i % 4 else random_keypresses(rng) for i in range(n)]
+
+
+def timed(fn, items) -> float:
+    t0 = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - t0
+
+
+def preview_timings(repeat: int = 2000):
+    """Per keystroke: LivePreview (append + render + "←") against a from-scratch engine parse."""
+    unit = "12×3 ＋ 45÷(6−7)−"  # 12 tokens
+    print(f"\n{'tokens':>8} {'preview':>12} {'re-parse':>12}")
+    for copies in (1, 10, 80):  # up to calc_engine.MAX_TOKENS
+        text = unit * copies
+        preview = LivePreview()
+        preview.sync(text)
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            preview.sync(text + "8")
+            preview.render()
+            preview.sync(text)
+        incremental = (time.perf_counter() - t0) / repeat
+        t0 = time.perf_counter()
+        for i in range(repeat):
+            calc_engine.parse(f"{text}{i}")
+        full = (time.perf_counter() - t0) / repeat
+        print(f"{len(calc_engine.tokenize(text)) + 1:>8} {incremental * 1e6:9.2f} us {full * 1e6:9.2f} us")
+
+
+def array_timings(n: int = 1_000_000, looped: int = 50_000):
+    """calc_array over n values against replace + eval once per value (timed on `looped` values)."""
+    expr = "x×x − 3×x ＋ 1÷(x＋2)"
+    compiled = calc_array.compile_array(expr)
+    t0 = time.perf_counter()
+    stats, _ = calc_array.run(compiled, calc_array.range_chunks(0.0, 1.0, n))
+    vectorized = (time.perf_counter() - t0) / n
+    values = [i / looped for i in range(looped)]
+    t0 = time.perf_counter()
+    for v in values:
+        old_calculate(expr.replace("x", f"({v!r})"))
+    per_value = (time.perf_counter() - t0) / looped
+    print(f"\narray mode, {expr}")
+    print(f"  eval per value   {per_value * 1e9:10.1f} ns/value")
+    print(f"  calc_array       {vectorized * 1e9:10.1f} ns/value   {per_value / vectorized:6.0f}x   mean {stats['mean']:.6g}")
+
+
+def main():
+    warnings.simplefilter("ignore", SyntaxWarning)  # eval("2(3)") warns before failing
+    parser = argparse.ArgumentParser(description="calc_engine vs replace + eval")
+    parser.add_argument("--n", type=int, default=20_000, help="expressions to generate")
+    args = parser.parse_args()
+
+    exprs = corpus(args.n)
+    mismatches = [(e, old_calculate(e), calc_engine.calculate(e))
+                  for e in exprs if old_calculate(e) != calc_engine.calculate(e)]
+    print(f"{len(exprs):,} expressions, {len(set(exprs)):,} distinct, {len(mismatches)} mismatches")
+    for expr, old, new in mismatches[:10]:
+        print(f"  {expr!r}: eval -> {old!r}, engine -> {new!r}")
+
+    results = {"replace + eval": timed(old_calculate, exprs)}
+    results["engine, cold cache"] = timed(lambda e: (calc_engine.compile_expression.cache_clear(),
+                                                     calc_engine.calculate(e)), exprs)
+    for e in exprs[:calc_engine.CACHE_SIZE]:
+        calc_engine.calculate(e)
+    hot = exprs[:calc_engine.CACHE_SIZE] * max(1, len(exprs) // calc_engine.CACHE_SIZE)
+    results["engine, warm cache"] = timed(calc_engine.calculate, hot) * len(exprs) / len(hot)
+
+    base = results["replace + eval"]
+    for name, seconds in results.items():
+        print(f"{name:<22} {seconds / len(exprs) * 1e6:8.2f} us/expr   {base / seconds:6.1f}x")
+    print(f"cache: {calc_engine.cache_info()}")
+    preview_timings()
+    array_timings()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from calc_engine import TOO_EXPENSIVE
+from calc_sandbox import calculate
+
+# ------------------------------
+# Browser-side calculator keypad
+# ------------------------------
+# calc_frontend/index.html draws the display and the keypad and does all the
+# expression editing (keys, ←, ±, keyboard input) in the browser. Only "=" and
+# "%" send {id, expression, percent} to Python, which evaluates it once and
+# passes {id, text, ok} back as the `result` argument for the display. Server
+# work per calculation is one script run, however many keys were pressed.
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calc_frontend")
+
+_keypad = components.declare_component("calculator_keypad", path=FRONTEND_DIR)
+
+
+def calculator_keypad(key: str = "keypad"):
+    """
+    Renders the keypad and answers its latest request. The request is read from
+    session state before the component is drawn, so the result goes out in the
+    same script run that received it.
+    """
+    request = st.session_state.get(key)
+    answered = st.session_state.get(f"{key}_result")
+    if request and (answered is None or answered["id"] != request["id"]):
+        text = calculate(request["expression"], percent=request["percent"])
+        answered = {"id": request["id"], "text": text, "ok": text not in ("Error", TOO_EXPENSIVE)}
+        st.session_state[f"{key}_result"] = answered
+    _keypad(result=answered, key=key, default=None)
+    return answered
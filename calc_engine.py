@@ -0,0 +1,338 @@
+import math
+import operator
+import re
+from functools import lru_cache
+
+# ------------------------------
+# Safe expression engine for the calculator apps
+# ------------------------------
+# tokenize() reads the display string as-is: one str.translate maps ÷ × − ＋
+# and ± to ASCII (no chain of str.replace calls) and one regex scans the
+# tokens. parse() is a precedence parser
+# that builds a compact tuple AST, compile_expression() flattens that into a
+# postfix program and keeps the last CACHE_SIZE programs in an LRU cache, and
+# evaluate() runs the program on a small stack. Nothing is passed to eval().
+#
+# Numbers and operators follow Python's rules, so results (and str() of them)
+# are what the old replace + eval path produced: int stays int, / is true
+# division, // and ** work, -2**2 == -4. Extensions: ± is a sign flip and a
+# trailing % (not followed by an operand) means "per cent", 50% == 0.5.
+#
+# Budget: by default an int power may have an exponent of at most MAX_EXPONENT
+# and no int result may exceed MAX_BITS bits (about 4,200 digits, so every
+# result can also be shown). The checks run before the operation, so 9**9**9
+# fails in microseconds with OverBudget instead of pinning the process;
+# calc_sandbox retries such expressions in a worker. Length alone is cheap:
+# parsing and evaluating are linear, and only parentheses recurse, so a long
+# keypad sum stays in-process. MAX_TOKENS only bounds the size of a cached
+# program, and parentheses nest at most MAX_DEPTH deep (a plain error, with or
+# without the budget, since it is a limit of the parser, not of the cost).
+
+CACHE_SIZE = 1024
+MAX_TOKENS = 1000
+MAX_DEPTH = 100
+MAX_EXPONENT = 10_000
+MAX_BITS = 14_000
+TOO_EXPENSIVE = "Too expensive"
+
+# Display symbols -> ASCII in one str.translate pass (1:1, so positions stay valid)
+SYMBOLS = str.maketrans({
+    "÷": "/",
+    "×": "*",
+    "−": "-",
+    "＋": "+",
+    "±": "~",  # sign flip
+})
+# Loose on purpose: "1.2.3" is one bad number, not two numbers; parse_number checks it against _NUMBER
+_TOKEN = re.compile(r"\s*(?:([0-9.]+(?:[eE][-+]?[0-9]+)?)|([A-Za-z][A-Za-z0-9]*)|(\*\*|//|[-+*/%()~]))")
+# Python's float syntax (what str() shows, e.g. 1e+20 or 1e-05), minus underscores, inf and nan
+_NUMBER = re.compile(r"(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?")
+
+def _checked_mul(a, b):
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_BITS:
+        raise OverBudget(f"Product of {a.bit_length()}-bit and {b.bit_length()}-bit integers")
+    return a * b
+
+
+def _checked_pow(a, b):
+    if isinstance(a, int) and isinstance(b, int) and b > 0 and abs(a) > 1:
+        if b > MAX_EXPONENT:
+            raise OverBudget(f"Exponent {b} > {MAX_EXPONENT}")
+        bits = b * math.log2(abs(a))
+        if bits > MAX_BITS:
+            raise OverBudget(f"Power of about {bits:.0f} bits")
+    return a ** b
+
+
+BINARY = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow,
+}
+CHECKED = dict(BINARY, **{"*": _checked_mul, "**": _checked_pow})
+UNARY = {
+    "neg": operator.neg,
+    "pos": operator.pos,
+    "pct": lambda x: x / 100,
+}
+
+
+class CalcError(ValueError):
+    """Malformed expression (the apps show it as "Error")."""
+
+
+class OverBudget(CalcError):
+    """The expression is over the evaluation budget (the apps show TOO_EXPENSIVE)."""
+
+
+def parse_number(text: str, pos: int, budget: bool = True):
+    if not _NUMBER.fullmatch(text):
+        raise CalcError(f"Bad number {text!r} at {pos}")
+    if not text.isdigit():  # a point or an exponent makes it a float, as in Python
+        return float(text)
+    if budget and len(text) * 3.33 > MAX_BITS:
+        raise OverBudget(f"{len(text)}-digit number at {pos}")
+    # Same rule as Python literals: 007 is not a number, 000 is
+    if len(text) > 1 and text[0] == "0" and text.strip("0"):
+        raise CalcError(f"Leading zeros in {text!r} at {pos}")
+    return int(text)
+
+
+def tokenize(text: str, budget: bool = True) -> list:
+    """[(kind, value, position)] with kind "num", "name" or "op"."""
+    ascii_text = text.translate(SYMBOLS).rstrip()
+    tokens = []
+    pos, n = 0, len(ascii_text)
+    match = _TOKEN.match
+    while pos < n:
+        m = match(ascii_text, pos)
+        if m is None:
+            bad = len(ascii_text[pos:]) - len(ascii_text[pos:].lstrip()) + pos
+            raise CalcError(f"Unexpected {text[bad]!r} at {bad}")
+        number, name, op = m.groups()
+        if number is not None:
+            tokens.append(("num", parse_number(number, m.start(1), budget), m.start(1)))
+        elif name is not None:
+            tokens.append(("name", name, m.start(2)))
+        else:
+            # ** and // (two presses of × or ÷ in the apps, like Python)
+            tokens.append(("op", "neg" if op == "~" else op, m.start(3)))
+        pos = m.end()
+        if budget and len(tokens) > MAX_TOKENS:
+            raise OverBudget(f"More than {MAX_TOKENS} tokens")
+    return tokens
+
+
+class _Parser:
+    """
+    expr    := term (("+" | "-") term)*
+    term    := unary (("*" | "/" | "//" | "%") unary)*
+    unary   := ("-" | "+" | "±") unary | power
+    power   := postfix ("**" unary)?
+    postfix := atom ("%")*             -- only when no operand follows
+    atom    := number | name | "(" expr ")"
+    """
+
+    _END = (None, None, None)
+
+    def __init__(self, tokens):
+        self.tokens = tokens + [self._END, self._END]  # peek(1) never runs off the end
+        self.i = 0
+        self.depth = 0  # open parentheses: the only recursion, sign and ** chains are loops
+
+    def peek(self, offset: int = 0):
+        return self.tokens[self.i + offset]
+
+    def take(self):
+        tok = self.tokens[self.i]
+        self.i += 1
+        return tok
+
+    def starts_operand(self, tok) -> bool:
+        kind, value, _ = tok
+        return kind in ("num", "name") or value in ("(", "-", "+", "neg")
+
+    def parse(self):
+        if self.tokens[0] is self._END:
+            raise CalcError("Empty expression")
+        node = self.expr()
+        kind, value, pos = self.peek()
+        if kind is not None:
+            raise CalcError(f"Unexpected {value!r} at {pos}")
+        return node
+
+    def expr(self):
+        node = self.term()
+        while True:
+            kind, op, _ = self.tokens[self.i]
+            if kind != "op" or op not in ("+", "-"):
+                break
+            self.i += 1
+            node = (op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while True:
+            kind, op, _ = self.tokens[self.i]
+            if kind != "op" or op not in ("*", "/", "//", "%"):
+                break
+            self.i += 1
+            node = (op, node, self.unary())
+        return node
+
+    def signs(self) -> list:
+        signs = []
+        while True:
+            kind, value, _ = self.tokens[self.i]
+            if kind != "op" or value not in ("-", "+", "neg"):
+                return signs
+            self.i += 1
+            signs.append("pos" if value == "+" else "neg")
+
+    def unary(self):
+        kind, value, _ = self.tokens[self.i]
+        if kind != "op" or value not in ("-", "+", "neg"):
+            return self.power()
+        signs = self.signs()
+        node = self.power()
+        for sign in reversed(signs):
+            node = (sign, node)
+        return node
+
+    def power(self):
+        node = self.postfix()
+        if self.tokens[self.i][1] != "**":
+            return node
+        # a ** -b ** c == a ** (-(b ** c)): right-associative, folded from the right
+        operands, signs = [node], []
+        while self.peek()[:2] == ("op", "**"):
+            self.take()
+            signs.append(self.signs())
+            operands.append(self.postfix())
+        node = operands.pop()
+        while operands:
+            for sign in reversed(signs.pop()):
+                node = (sign, node)
+            node = ("**", operands.pop(), node)
+        return node
+
+    def postfix(self):
+        node = self.atom()
+        while self.peek()[:2] == ("op", "%") and not self.starts_operand(self.peek(1)):
+            self.take()
+            node = ("pct", node)
+        return node
+
+    def atom(self):
+        kind, value, pos = self.take()
+        if kind == "num":
+            return ("num", value)
+        if kind == "name":
+            return ("var", value)
+        if (kind, value) == ("op", "("):
+            self.depth += 1
+            if self.depth > MAX_DEPTH:
+                raise CalcError(f"Parentheses nested deeper than {MAX_DEPTH} at {pos}")
+            node = self.expr()
+            if self.take()[:2] != ("op", ")"):
+                raise CalcError(f"Missing ')' for '(' at {pos}")
+            self.depth -= 1
+            return node
+        if kind is None:
+            raise CalcError("Expression ends early")
+        raise CalcError(f"Unexpected {value!r} at {pos}")
+
+
+def parse(text: str, budget: bool = True):
+    """Tuple AST: ("num", v), ("var", name), (unary, x) or (binary, a, b)."""
+    return _Parser(tokenize(text, budget)).parse()
+
+
+def postorder(tree):
+    """
+    The nodes of `tree`, operands before their operator. A loop, not recursion:
+    a long sum is a left-deep tree as many levels deep as it has terms.
+    """
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded or node[0] in ("num", "var"):
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node[1:]))
+
+
+class CompiledExpression:
+    """A parsed expression flattened to a postfix program."""
+
+    __slots__ = ("text", "program", "variables")
+
+    def __init__(self, text: str, tree, budget: bool = True):
+        self.text = text
+        program, variables = [], set()
+        binary = CHECKED if budget else BINARY
+
+        for node in postorder(tree):
+            kind = node[0]
+            if kind == "num":
+                program.append((0, node[1]))
+            elif kind == "var":
+                variables.add(node[1])
+                program.append((1, node[1]))
+            elif kind in UNARY:
+                program.append((2, UNARY[kind]))
+            else:
+                program.append((3, binary[kind]))
+        self.program = tuple(program)
+        self.variables = frozenset(variables)
+
+    def evaluate(self, variables=None):
+        stack = []
+        push = stack.append
+        for code, arg in self.program:
+            if code == 0:
+                push(arg)
+            elif code == 3:
+                b = stack.pop()
+                stack[-1] = arg(stack[-1], b)
+            elif code == 2:
+                stack[-1] = arg(stack[-1])
+            else:
+                if variables is None or arg not in variables:
+                    raise CalcError(f"Unknown name {arg!r}")
+                push(variables[arg])
+        return stack[0]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text: str, budget: bool = True) -> CompiledExpression:
+    return CompiledExpression(text, parse(text, budget), budget)
+
+
+def evaluate(text: str, variables=None, budget: bool = True):
+    """
+    Value of a display expression. Raises CalcError or ArithmeticError, and
+    OverBudget when `budget` is on and a limit would be exceeded.
+    """
+    return compile_expression(text, budget).evaluate(variables)
+
+
+def calculate(text: str, percent: bool = False) -> str:
+    """What the "=" (or, with percent, the "%") key shows: str() of the value, "Error" or TOO_EXPENSIVE."""
+    try:
+        value = evaluate(text)
+        return str(value / 100 if percent else value)
+    except OverBudget:
+        return TOO_EXPENSIVE
+    except (CalcError, ArithmeticError, TypeError):
+        return "Error"
+
+
+def cache_info():
+    return compile_expression.cache_info()
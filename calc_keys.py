@@ -0,0 +1,53 @@
+from calc_engine import TOO_EXPENSIVE
+from calc_sandbox import calculate as calculate_isolated
+
+# ------------------------------
+# Keypad semantics shared by the calculators and calc_batch.py
+# ------------------------------
+# press() is what one keypad button does to the display string: "=" and "%"
+# replace it with the result (of the whole expression, divided by 100 for
+# "%"), "±" toggles a leading minus, a digit right after a result starts over.
+# replay() types a whole line through press(), so headless tools get exactly
+# what a user pressing those keys would see.
+
+# Display text of the operator buttons (calculator.py shows ASCII operators)
+KEY_DISPLAY = {"÷": "/", "×": "*", "−": "-", " ＋ ": "+"}
+
+# Typed characters -> keypad buttons, as the keyboard handler maps them
+CHAR_KEYS = {"/": "÷", "*": "×", "-": "−", "+": " ＋ ", "＋": " ＋ "}
+
+
+def press(expression: str, btn: str, last_was_equals: bool = False,
+          display=KEY_DISPLAY, calculate=calculate_isolated):
+    """(expression, last_was_equals) after pressing `btn`."""
+    if btn == "C":
+        return "", last_was_equals
+    if btn == "←":
+        return expression[:-1], last_was_equals
+    if btn in ("=", "%"):
+        # Over-budget expressions (9**9**9) run in an isolated worker by default
+        shown = calculate(expression, percent=btn == "%")
+        return shown, shown not in ("Error", TOO_EXPENSIVE)
+    if btn == "±":
+        return (expression[1:] if expression.startswith("-") else "-" + expression), last_was_equals
+    # Clear display if last operation was equals
+    if last_was_equals and btn in "0123456789.()":
+        return btn, False
+    return expression + display.get(btn, btn), False
+
+
+def replay(keys: str, calculate=calculate_isolated) -> str:
+    """
+    The display after typing `keys` one character per button (keyboard
+    operators allowed, whitespace ignored), then "=" unless the last key was
+    "=" or "%".
+    """
+    expression, last_was_equals, last = "", False, None
+    for char in keys:
+        if char.isspace():
+            continue
+        last = CHAR_KEYS.get(char, char)
+        expression, last_was_equals = press(expression, last, last_was_equals, calculate=calculate)
+    if last in ("=", "%"):
+        return expression
+    return press(expression, "=", calculate=calculate)[0]
@@ -0,0 +1,240 @@
+from calc_engine import CHECKED, MAX_DEPTH, MAX_TOKENS, SYMBOLS, UNARY, CalcError, OverBudget, parse_number
+
+# ------------------------------
+# Incremental live preview for the calculator display
+# ------------------------------
+# The keypad only ever appends to the display string or deletes its last
+# character, so LivePreview keeps one immutable parser state per character:
+# appending feeds one character to the newest state, "←" drops the newest
+# state. Nothing is re-tokenized or re-parsed.
+#
+# A state is a shunting-yard parser that evaluates as it goes (same grammar,
+# precedence and budget as calc_engine.parse). Operand and operator stacks are
+# persistent linked lists, (head, tail) tuples, so deriving a state is O(1)
+# and old states stay valid. Binary operators are reduced as soon as
+# precedence allows, so the pending operator stack only grows with the nesting
+# depth, not with the length of the expression; computing the preview of a
+# state (close open parentheses, drop a trailing operator, reduce what is
+# pending) costs the same for 10 characters as for 10,000.
+
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "//": 2, "%": 2, "neg": 3, "pos": 3, "**": 4}
+RIGHT_ASSOC = {"**"}
+PENDING = "…"   # shown while the running result is over the budget
+DIGITS = set("0123456789.")
+LETTERS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+EXPONENT = set("eE")  # inside a number, as in calc_engine's float syntax
+
+
+class _State:
+    """One parser state; never mutated once another state has been derived from it."""
+
+    __slots__ = ("values", "ops", "expect", "dangling", "depth", "partial", "pct", "tokens", "error")
+
+    def __init__(self, values=None, ops=None, expect=True, dangling=0, depth=0,
+                 partial="", pct=False, tokens=0, error=None):
+        self.values = values        # operand stack
+        self.ops = ops              # pending operators, "(" included
+        self.expect = expect        # an operand comes next
+        self.dangling = dangling    # operators pushed since the last operand
+        self.depth = depth          # open parentheses
+        self.partial = partial      # token still being typed: number, name, "*" or "/"
+        self.pct = pct              # a "%" after an operand: per cent unless an operand follows
+        self.tokens = tokens
+        self.error = error          # None, "error" or "budget"
+
+    def copy(self, **changes):
+        state = _State.__new__(_State)
+        for name in _State.__slots__:
+            setattr(state, name, changes.get(name, getattr(self, name)))
+        return state
+
+    def fail(self, exc):
+        return self.copy(error="budget" if isinstance(exc, OverBudget) else "error")
+
+    # --- characters -> tokens ---
+
+    def feed(self, char: str):
+        """The state after one more display character."""
+        if self.error:
+            return self
+        c = char.translate(SYMBOLS)
+        partial = self.partial
+        number = partial[:1] in DIGITS
+        if c in DIGITS:
+            # Names may contain digits after the first letter, numbers never contain letters
+            if partial and (number or (partial[0] in LETTERS and c != ".")):
+                return self.copy(partial=partial + c)
+        elif c in EXPONENT and number and not EXPONENT & set(partial):
+            return self.copy(partial=partial + c)  # 2e+20, 1e-05: only digits may complete it
+        elif c in "+-" and number and partial[-1] in EXPONENT:
+            return self.copy(partial=partial + c)
+        elif c in LETTERS:
+            if partial and partial[0] in LETTERS:
+                return self.copy(partial=partial + c)
+        elif c in "*/" and partial == c:
+            return self.copy(partial=c + c)
+        elif c.isspace():
+            return self.flush()
+        elif c not in "+-%()~*/":
+            return self.copy(error="error")
+
+        state = self.flush()
+        if state.error:
+            return state
+        if c in DIGITS or c in LETTERS or c in "*/":
+            return state.copy(partial=c)
+        return state.token("neg" if c == "~" else c, op=True)
+
+    def flush(self):
+        """Commit the token being typed."""
+        partial = self.partial
+        if not partial:
+            return self
+        state = self.copy(partial="")
+        if partial[0] in LETTERS:
+            return state.copy(error="error")  # no variables on the keypad
+        if partial[0] in "*/":
+            return state.token(partial, op=True)
+        try:
+            return state.token(parse_number(partial, 0), op=False)
+        except CalcError as e:
+            return state.fail(e)
+
+    # --- tokens -> parser ---
+
+    def token(self, value, op: bool):
+        if self.tokens >= MAX_TOKENS:  # same token budget as calc_engine.tokenize
+            return self.fail(OverBudget(f"More than {MAX_TOKENS} tokens"))
+        state = self.copy(tokens=self.tokens + 1)
+        starts_operand = not op or value in ("(", "-", "+", "neg")
+        if state.pct:
+            # The previous "%" was modulo if an operand follows, per cent otherwise
+            state = state.copy(pct=False)
+            state = state.push_binary("%") if starts_operand else state.apply("pct")
+            if state.error:
+                return state
+        if state.expect:
+            if not op:
+                return state.copy(values=(value, state.values), expect=False, dangling=0)
+            if value in ("(", "-", "+", "neg"):
+                if value == "(" and state.depth >= MAX_DEPTH:  # calc_engine's nesting limit
+                    return state.copy(error="error")
+                return state.copy(
+                    ops=({"-": "neg", "+": "pos"}.get(value, value), state.ops),
+                    dangling=state.dangling + 1,
+                    depth=state.depth + (value == "("),
+                )
+            return state.copy(error="error")
+        if not op or value in ("(", "neg"):
+            return state.copy(error="error")  # two operands in a row, "2(3)"
+        if value == "%":
+            return state.copy(pct=True)
+        if value == ")":
+            if not state.depth:
+                return state.copy(error="error")
+            while state.ops[0] != "(":
+                state = state.reduce()
+                if state.error:
+                    return state
+            return state.copy(ops=state.ops[1], depth=state.depth - 1)
+        return state.push_binary(value)
+
+    def push_binary(self, op: str):
+        state = self
+        prec = PRECEDENCE[op]
+        while state.ops is not None and state.ops[0] != "(":
+            top = PRECEDENCE[state.ops[0]]
+            if top < prec or (top == prec and op in RIGHT_ASSOC):
+                break
+            state = state.reduce()
+            if state.error:
+                return state
+        return state.copy(ops=(op, state.ops), expect=True, dangling=1)
+
+    def apply(self, unary: str):
+        try:
+            return self.copy(values=(UNARY[unary](self.values[0]), self.values[1]))
+        except (ArithmeticError, TypeError) as e:
+            return self.fail(e)
+
+    def reduce(self):
+        """Apply the top operator to the top operand(s)."""
+        op, ops = self.ops
+        if op in UNARY:
+            return self.copy(ops=ops).apply(op)
+        b, (a, rest) = self.values
+        try:
+            return self.copy(values=(CHECKED[op](a, b), rest), ops=ops)
+        except (CalcError, ArithmeticError, TypeError) as e:
+            return self.fail(e)
+
+    def result(self):
+        """The running value: open parentheses closed, a trailing operator ignored. None if there is none."""
+        state = self.flush()
+        if not state.error and state.pct:
+            state = state.copy(pct=False).apply("pct")
+        if state.error:
+            return state.error
+        if state.expect:
+            ops = state.ops
+            for _ in range(state.dangling):
+                ops = ops[1]
+            state = state.copy(ops=ops)
+        if state.values is None:
+            return None
+        while state.ops is not None:
+            if state.ops[0] == "(":
+                state = state.copy(ops=state.ops[1])
+            else:
+                state = state.reduce()
+                if state.error:
+                    return state.error
+        return state.values[0]
+
+
+_START = _State()
+
+
+class LivePreview:
+    """Running result of a display string that grows and shrinks at the end."""
+
+    def __init__(self):
+        self.text = ""
+        self.states = [_START]
+
+    def push(self, chars: str):
+        for char in chars:
+            self.states.append(self.states[-1].feed(char))
+        self.text += chars
+
+    def pop(self, n: int = 1):
+        n = min(n, len(self.text))
+        if n:
+            del self.states[-n:]
+            self.text = self.text[:-n]
+
+    def sync(self, expression: str):
+        """Catch up with the display: appends and deletions at the end are incremental, anything else restarts."""
+        if expression.startswith(self.text):
+            self.push(expression[len(self.text):])
+        elif self.text.startswith(expression):
+            self.pop(len(self.text) - len(expression))
+        else:
+            self.__init__()
+            self.push(expression)
+
+    def value(self):
+        """The running value, None, "error" or "budget"."""
+        return self.states[-1].result()
+
+    def render(self, max_chars: int = 40) -> str:
+        """The preview line: "= 42", "= …" while over the budget, or "" when there is nothing to show."""
+        value = self.value()
+        if value is None or value == "error":
+            return ""
+        if value == "budget":
+            return f"= {PENDING}"
+        shown = str(value)
+        if len(shown) > max_chars:
+            shown = f"{shown[:max_chars - 12]}… ({len(shown)} chars)"
+        return f"= {shown}"
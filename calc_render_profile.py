@@ -0,0 +1,173 @@
+"""
+Per-rerun payload of the calculator keypads: classic against lean render mode.
+
+    python calc_render_profile.py                              # both calculators, both modes
+    python calc_render_profile.py calculator.py --keys 1 2 × 3 =
+    python calc_render_profile.py --output render_profile.json
+
+Every app is started with `streamlit run` once per mode (CALCULATOR_RENDER=
+classic / lean), then driven over its websocket the way a browser does: one
+page load, then one rerun request per key press. For each it counts what the
+server sends back: bytes on the wire, messages, elements (new element and
+add-block deltas) and script runs. calculator.py's browser keypad toggle is
+switched off first, so the server-side keypad is what gets measured.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APPS = ["calculator.py", "calculator_final.py"]
+MODES = ["classic", "lean"]
+KEYS = ["7", "×", "8", " ＋ ", "1", "2", "←", "=", "C"]
+SERVER_KEYPAD_TOGGLE = "Browser keypad"   # label prefix of calculator.py's toggle
+
+DONE = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+        ForwardMsg.FINISHED_WITH_COMPILE_ERROR}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_app(app: str, mode: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, CALCULATOR_RENDER=mode)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+         "--server.port", str(port), "--server.enableXsrfProtection", "false",
+         "--browser.gatherUsageStats", "false"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1) as r:
+                if r.read() == b"ok":
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{app} did not start on port {port}")
+
+
+class Session:
+    """One browser session: sends rerun requests, tallies what comes back."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}     # (kind, label) -> (widget id, fragment id)
+        self.sticky = []      # widget values sent with every rerun, like the frontend does
+
+    async def rerun(self, trigger=None, timeout: float = 30) -> dict:
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        states = list(self.sticky)
+        if trigger is not None:
+            widget_id, fragment_id = self.widgets[trigger]
+            states.append(WidgetState(id=widget_id, trigger_value=True))
+            if fragment_id:
+                msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(states)
+        await self.ws.send(msg.SerializeToString())
+
+        stats = {"bytes": 0, "messages": 0, "elements": 0, "runs": 0}
+        finished = False
+        while True:
+            try:
+                # After the final script_finished, only trailing status messages are left
+                raw = await asyncio.wait_for(self.ws.recv(), 0.3 if finished else timeout)
+            except asyncio.TimeoutError:
+                break
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            stats["bytes"] += len(raw)
+            stats["messages"] += 1
+            kind = fwd.WhichOneof("type")
+            if kind == "delta":
+                stats["elements"] += 1
+                self._track(fwd.delta)
+            elif kind == "script_finished":
+                stats["runs"] += 1
+                finished = fwd.script_finished in DONE
+        return stats
+
+    def _track(self, delta):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind in ("button", "checkbox"):
+            widget = getattr(element, kind)
+            self.widgets[(kind, widget.label)] = (widget.id, delta.fragment_id)
+
+
+async def profile_session(port: int, keys) -> dict:
+    async with websockets.connect(f"ws://localhost:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                  max_size=None) as ws:
+        session = Session(ws)
+        load = await session.rerun()
+        for (kind, label), (widget_id, _) in list(session.widgets.items()):
+            if kind == "checkbox" and label.startswith(SERVER_KEYPAD_TOGGLE):
+                session.sticky.append(WidgetState(id=widget_id, bool_value=False))
+                load = await session.rerun()
+        presses = [await session.rerun(trigger=("button", key)) for key in keys]
+    return {"load": load, "presses": presses}
+
+
+def profile(app: str, mode: str, keys) -> dict:
+    port = free_port()
+    proc = start_app(app, mode, port)
+    try:
+        result = asyncio.run(profile_session(port, keys))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    presses = result["presses"]
+    result["per_press"] = {k: statistics.mean(p[k] for p in presses) for k in ("bytes", "messages", "elements", "runs")}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-rerun payload of the calculator keypads")
+    parser.add_argument("apps", nargs="*", default=APPS, help="calculator scripts (default: both)")
+    parser.add_argument("--keys", nargs="+", default=KEYS, help="button labels to press in order")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    report = {"keys": args.keys, "results": {}}
+    for app in args.apps:
+        runs = {mode: profile(app, mode, args.keys) for mode in MODES}
+        report["results"][app] = runs
+        print(f"\n{app}  ({len(args.keys)} key presses)")
+        print(f"  {'':<22} {'classic':>10} {'lean':>10} {'change':>8}")
+        rows = [("page load bytes", "load", "bytes"), ("page load elements", "load", "elements"),
+                ("bytes / press", "per_press", "bytes"), ("elements / press", "per_press", "elements"),
+                ("messages / press", "per_press", "messages"), ("script runs / press", "per_press", "runs")]
+        for name, section, field in rows:
+            old, new = runs["classic"][section][field], runs["lean"][section][field]
+            change = f"{(new - old) / old:+.0%}" if old else ""
+            print(f"  {name:<22} {old:10.1f} {new:10.1f} {change:>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
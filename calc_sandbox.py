@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from calc_engine import TOO_EXPENSIVE, CalcError, OverBudget, compile_expression, evaluate
+from calc_engine import calculate as calculate_in_process
+
+# ------------------------------
+# Isolated evaluation for over-budget expressions
+# ------------------------------
+# calculate() evaluates in-process under calc_engine's budget, which covers
+# every normal keypad expression. Limits hit while reading the text (more than
+# MAX_TOKENS tokens, a number too long to show) are final: they bound the size
+# of the input, not the cost of evaluating it, so no worker is started. Only
+# an expression whose evaluation raises OverBudget is retried without the
+# budget in a separate Python process that has a hard wall-clock timeout, a
+# CPU limit and an address-space cap. If the worker is
+# killed, runs out of memory or there are already MAX_WORKERS running, the
+# display shows TOO_EXPENSIVE. The Streamlit process never runs the
+# expensive operation itself, so the other sessions are not stalled.
+
+TIMEOUT = 2.0        # seconds, wall clock
+MEMORY_MB = 256      # address-space cap of a worker
+MAX_WORKERS = 2      # concurrent workers per server process
+
+_workers = threading.BoundedSemaphore(MAX_WORKERS)
+
+
+def _limit_resources(timeout: float, memory_mb: int):
+    """Runs inside the worker. No-op where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    cpu = int(timeout) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    cap = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+
+
+def calculate_isolated(text: str, percent: bool = False, timeout: float = TIMEOUT,
+                       memory_mb: int = MEMORY_MB) -> str:
+    """calculate() without the budget, in a worker process; TOO_EXPENSIVE if it does not finish."""
+    if not _workers.acquire(timeout=timeout):
+        return TOO_EXPENSIVE
+    try:
+        request = json.dumps({"text": text, "percent": percent, "timeout": timeout, "memory_mb": memory_mb})
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)],
+            input=request, capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:  # subprocess.run kills the worker
+        return TOO_EXPENSIVE
+    finally:
+        _workers.release()
+    if result.returncode != 0:  # killed by the CPU limit, or died at the memory cap
+        return TOO_EXPENSIVE
+    return json.loads(result.stdout)["result"]
+
+
+def calculate(text: str, percent: bool = False) -> str:
+    """What the "=" (or "%") key shows. Expressions too costly to evaluate here run in an isolated worker."""
+    try:
+        compile_expression(text)  # cached, so calculate_in_process below does not parse again
+    except OverBudget:
+        return TOO_EXPENSIVE
+    except CalcError:
+        return "Error"
+    shown = calculate_in_process(text, percent)
+    if shown == TOO_EXPENSIVE:
+        return calculate_isolated(text, percent)
+    return shown
+
+
+def _worker():
+    request = json.loads(sys.stdin.read())
+    _limit_resources(request["timeout"], request["memory_mb"])
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(0)  # the result may be longer than 4,300 digits
+    try:
+        value = evaluate(request["text"], budget=False)
+        shown = str(value / 100 if request["percent"] else value)
+    except (MemoryError, RecursionError):
+        shown = TOO_EXPENSIVE
+    except (CalcError, ArithmeticError, TypeError):
+        shown = "Error"
+    json.dump({"result": shown}, sys.stdout)
+
+
+if __name__ == "__main__":
+    _worker()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import weakref
+
+import pandas as pd
+import streamlit as st
+
+from calc_array import CHUNK_SIZE, compile_array, csv_column_chunks, range_chunks, run
+from calc_engine import CalcError
+
+class _SessionFile:
+    """Owns a temp file; it is removed when the session's state is dropped or the server exits."""
+
+    def __init__(self, suffix: str):
+        fd, self.path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        weakref.finalize(self, _remove_file, self.path)
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def session_results_path() -> str:
+    """One results file per session, overwritten by every run."""
+    if "array_results_file" not in st.session_state:
+        st.session_state.array_results_file = _SessionFile(".csv")
+    return st.session_state.array_results_file.path
+
+
+st.title("Array Calculator")
+st.caption(
+    "Type an expression in one variable with the keypad symbols (÷ × − ＋) or plain "
+    "operators. It is compiled once into NumPy calls and evaluated in chunks of "
+    f"{CHUNK_SIZE:,} values, in float64."
+)
+
+expression = st.text_input("Expression", value="x × 2 ＋ 3")
+source = st.radio("Values", ["Range", "CSV column"], horizontal=True)
+
+if source == "Range":
+    c1, c2, c3 = st.columns(3)
+    start = c1.number_input("From", value=0.0)
+    stop = c2.number_input("To", value=1.0)
+    count = c3.number_input("Count", min_value=1, max_value=50_000_000, value=1_000_000, step=100_000)
+    upload, column = None, None
+else:
+    upload = st.file_uploader("CSV file", type=["csv"])
+    column = None
+    if upload is not None:
+        # Only the header is read here; the column itself is streamed in chunks
+        try:
+            header = pd.read_csv(upload, nrows=0).columns.tolist()
+        except ValueError as e:  # pandas' EmptyDataError / ParserError, undecodable bytes
+            st.error(f"Cannot read the CSV header: {e}")
+            st.stop()
+        column = st.selectbox("Column", header)
+
+write_csv = st.checkbox("Prepare a CSV download of all results", value=True)
+
+if st.button("Evaluate"):
+    try:
+        compiled = compile_array(expression)
+    except CalcError as e:
+        st.error(f"Cannot compile the expression: {e}")
+        st.stop()
+    if source == "CSV column":
+        if column is None:
+            st.warning("Upload a CSV file first.")
+            st.stop()
+        upload.seek(0)
+        chunks = csv_column_chunks(upload, column)
+    else:
+        chunks = range_chunks(start, stop, int(count))
+
+    # Results go chunk by chunk to this session's temporary file, not into session memory
+    st.session_state.pop("array_result", None)  # its file is about to be overwritten
+    path = session_results_path() if write_csv else None
+    try:
+        with st.spinner("Evaluating..."):
+            if path:
+                with open(path, "wb") as out:
+                    stats, head = run(compiled, chunks, out=out)
+            else:
+                stats, head = run(compiled, chunks)
+    except (ValueError, ArithmeticError, OSError) as e:  # a malformed CSV surfaces mid-stream
+        st.error(f"Evaluation failed: {e}")
+        st.stop()
+    st.session_state.array_result = {"expression": expression, "stats": stats, "head": head, "path": path}
+
+result = st.session_state.get("array_result")
+if result:
+    stats = result["stats"]
+    st.subheader(f"Result of {result['expression']}")
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Values", f"{stats['count']:,}")
+    k2.metric("Mean", "-" if stats["mean"] is None else f"{stats['mean']:.6g}")
+    k3.metric("Min", "-" if stats["min"] is None else f"{stats['min']:.6g}")
+    k4.metric("Max", "-" if stats["max"] is None else f"{stats['max']:.6g}")
+    st.dataframe(pd.DataFrame([stats]), hide_index=True)
+    st.caption("First rows")
+    st.dataframe(result["head"], hide_index=True)
+    if result["path"]:
+        def read_results(path=result["path"]):
+            # Called only when the button is clicked, so the file is not kept in session memory
+            with open(path, "rb") as f:
+                return f.read()
+
+        st.download_button("Download results (CSV)", data=read_results,
+                           file_name="array_results.csv", mime="text/csv")
@@ -1,14 +1,28 @@
+import os
+
 import streamlit as st
 
+from calc_keys import press
+from calc_preview import LivePreview
+
 # Set page config
 st.markdown("""
 <h1 style='text-align: center; margin-bottom: 10px;'>Khizar Shujaat's Calculator</h1>
 """, unsafe_allow_html=True)
 
+# "lean" (default): the keypad is a fragment, buttons are colored through their
+# keys only and the display carries no inline styles. "classic" is the old
+# render path, kept for calc_render_profile.py.
+LEAN = os.environ.get("CALCULATOR_RENDER", "lean") != "classic"
+
 # Initialize expression
 if "expression" not in st.session_state:
     st.session_state.expression = ""
 
+# Parser states of the running result, one per display character
+if "preview" not in st.session_state:
+    st.session_state.preview = LivePreview()
+
 # Button layout (as strings)
 buttons = [
     ["C", "(", ")", "←"],
@@ -29,9 +43,9 @@ color_map = {
     "(": "blue", ")": "blue", "±": "blue"
 }
 
-# Symbol replacement for eval
+# Symbol replacement for the display: only the spaced plus, ÷ × − are shown as typed
 symbol_map = {
-    "÷": "/", "×": "*", "−": "-", " ＋ ":"+"
+    " ＋ ": "+"
 }
 
 # Custom CSS
@@ -58,6 +72,28 @@ div.stButton > button {
     margin-bottom: 5px;
 }
 
+/* Display and preview line (inline in the classic render mode) */
+.display-area {
+    background: linear-gradient(to bottom, #c2e6fa, #a0d1f2);
+    padding: 15px;
+    border-radius: 8px;
+    font-size: 28px;
+    font-weight: bold;
+    text-align: right;
+    margin-bottom: 20px;
+    color: #002B45;
+    box-shadow: inset 0 0 5px #0077b6;
+    height: 65px;
+}
+
+.preview-line {
+    text-align: right;
+    font-size: 18px;
+    color: #4a6572;
+    margin: -12px 5px 12px 0;
+    min-height: 24px;
+}
+
 /* Special equal button that spans 3 columns */
 .st-key---orange button {
     grid-column: span 3;
@@ -73,84 +109,83 @@ div[class*="st-key"][class*="-orange"] button { background-color: #ff9800; color
 </style>
 """, unsafe_allow_html=True)
 
-with st.container(border=True):
-
-    # Display area
-    st.markdown(f"""
-    <div class="display-area" style='
-        background: linear-gradient(to bottom, #c2e6fa, #a0d1f2);
-        padding: 15px;
-        border-radius: 8px;
-        font-size: 28px;
-        font-weight: bold;
-        text-align: right;
-        margin-bottom: 20px;
-        color: #002B45;
-        box-shadow: inset 0 0 5px #0077b6;
-        height: 65px;
-    '>
-        {st.session_state.expression}
-    </div>
-    """, unsafe_allow_html=True)
-
-    # Render grid buttons
-    for row in buttons:
-        cols = st.columns(4, vertical_alignment="center")
-        for i, btn in enumerate(row):
-            if btn == "":
-                cols[i].markdown(" ")
-                continue
-
-            with cols[i]:
-                clicked = st.button(btn, key=f"{btn}-{color_map.get(btn)}")
-                # Inject class styling for the most recent button
-                st.markdown(
-                    f"<script>var btns = parent.document.querySelectorAll('button'); btns[btns.length-1].classList.add('{color_map.get(btn, 'blue')}');</script>",
-                    unsafe_allow_html=True
-                )
-                if clicked:
-                    # Check if the last operation was equals
-                    last_was_equals = st.session_state.get("last_was_equals", False)
-
-                    if btn == "C":
-                        st.session_state.expression = ""
-                    elif btn == "←":
-                        st.session_state.expression = st.session_state.expression[:-1]
-                    elif btn == "=":
-                        try:
-                            expr = st.session_state.expression
-                            for k, v in symbol_map.items():
-                                expr = expr.replace(k, v)
-                            st.session_state.expression = str(eval(expr))
-                            st.session_state.last_was_equals = True
-                        except:
-                            st.session_state.expression = "Error"
-                            st.session_state.last_was_equals = False
-                    elif btn == "%":
-                        try:
-                            # Safely convert last number or entire expression to percentage
-                            expr = st.session_state.expression
-                            for k, v in symbol_map.items():
-                                expr = expr.replace(k, v)
-                            result = str(eval(expr) / 100)
-                            st.session_state.expression = result
-                            st.session_state.last_was_equals = True
-                        except:
-                            st.session_state.expression = "Error"
-                            st.session_state.last_was_equals = False
-                    elif btn == "±":
-                        if st.session_state.expression.startswith("-"):
-                            st.session_state.expression = st.session_state.expression[1:]
-                        else:
-                            st.session_state.expression = "-" + st.session_state.expression
-                    elif btn == " ＋ ":
-                        st.session_state.expression += symbol_map.get(btn)
-                    else:
-                        # Clear display if last operation was equals
-                        if last_was_equals:
-                            st.session_state.expression = btn if btn != "±" else "-"
-                        else:
-                            st.session_state.expression += btn
-                        st.session_state.last_was_equals = False
-                    st.rerun()
 
+def handle_button_click(btn):
+    st.session_state.expression, st.session_state.last_was_equals = press(
+        st.session_state.expression, btn, st.session_state.get("last_was_equals", False), display=symbol_map
+    )
+
+
+def render_keypad():
+    with st.container(border=True):
+
+        # Running result: appends and "←" update it incrementally
+        st.session_state.preview.sync(st.session_state.expression)
+        running_result = "" if st.session_state.get("last_was_equals") else st.session_state.preview.render()
+
+        # Display area
+        if LEAN:
+            # Styles live in the CSS block, which is sent once per session
+            st.markdown(
+                f'<div class="display-area">{st.session_state.expression}</div>'
+                f'<div class="preview-line">{running_result or "&nbsp;"}</div>',
+                unsafe_allow_html=True,
+            )
+        else:
+            st.markdown(f"""
+            <div class="display-area" style='
+                background: linear-gradient(to bottom, #c2e6fa, #a0d1f2);
+                padding: 15px;
+                border-radius: 8px;
+                font-size: 28px;
+                font-weight: bold;
+                text-align: right;
+                margin-bottom: 20px;
+                color: #002B45;
+                box-shadow: inset 0 0 5px #0077b6;
+                height: 65px;
+            '>
+                {st.session_state.expression}
+            </div>
+            <div class="preview-line" style='
+                text-align: right;
+                font-size: 18px;
+                color: #4a6572;
+                margin: -12px 5px 12px 0;
+                min-height: 24px;
+            '>
+                {running_result or "&nbsp;"}
+            </div>
+            """, unsafe_allow_html=True)
+
+        # Render grid buttons
+        for row in buttons:
+            cols = st.columns(4, vertical_alignment="center")
+            for i, btn in enumerate(row):
+                if btn == "":
+                    if not LEAN:
+                        cols[i].markdown(" ")
+                    continue
+
+                with cols[i]:
+                    if LEAN:
+                        # Colored by the -red/-blue/... key suffix through the CSS above; the
+                        # callback runs before the fragment reruns, so no st.rerun() either
+                        st.button(btn, key=f"{btn}-{color_map.get(btn)}", on_click=handle_button_click, args=(btn,))
+                        continue
+                    clicked = st.button(btn, key=f"{btn}-{color_map.get(btn)}")
+                    # Inject class styling for the most recent button
+                    st.markdown(
+                        f"<script>var btns = parent.document.querySelectorAll('button'); btns[btns.length-1].classList.add('{color_map.get(btn, 'blue')}');</script>",
+                        unsafe_allow_html=True
+                    )
+                    if clicked:
+                        handle_button_click(btn)
+                        st.rerun()
+
+
+if LEAN:
+    # Keypad clicks rerun only this fragment: the heading and CSS above are not sent again
+    st.fragment(render_keypad)()
+else:
+    render_keypad()
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from calc_sandbox import calculate
+
 st.title("Unicode Calculator")
 
 # Button layout using Unicode and spaced `+`
@@ -10,14 +12,6 @@ layout = [
     ["0", "C", "=", " ＋ "]      # Fullwidth plus (U+FF0B)
 ]
 
-# Mapping display symbols to actual Python operators
-symbol_map = {
-    "÷": "/",
-    "×": "*",
-    "−": "-",
-    "＋": "+"  # Fullwidth plus to normal plus
-}
-
 # Initialize expression in session state
 if "expression" not in st.session_state:
     st.session_state.expression = ""
@@ -31,14 +25,8 @@ for i, row in enumerate(layout):
             if cleaned_label == "C":
                 st.session_state.expression = ""
             elif cleaned_label == "=":
-                try:
-                    # Convert symbols to Python operators
-                    expr = st.session_state.expression
-                    for sym, op in symbol_map.items():
-                        expr = expr.replace(sym, op)
-                    st.session_state.expression = str(eval(expr))
-                except:
-                    st.session_state.expression = "Error"
+                # calc_engine reads ÷ × − ＋ directly; over-budget input runs in a worker
+                st.session_state.expression = calculate(st.session_state.expression)
             else:
                 st.session_state.expression += cleaned_label
 
@@ -24,10 +24,8 @@ st.error("This is error")
 
 st.write(range(10))
 
-from PIL import Image
-
-img = Image.open("test_image.jpg")
-st.image(img, width=300)
+# st.image reads the file itself; no PIL import needed in the script
+st.image("test_image.jpg", width=300)
 
 st.video("https://youtu.be/rZySQU_WzDc?si=AyHt8Ey6rcBsKhh_")
 
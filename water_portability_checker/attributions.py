@@ -0,0 +1,141 @@
+import numpy as np
+
+from forest_engine import CompiledForest, export_forest
+from forest_optimize import round_down_float32
+
+# ------------------------------
+# Exact TreeSHAP attributions for the potable probability
+# ------------------------------
+# Path-dependent TreeSHAP (Lundberg et al.), the values shap.TreeExplainer
+# reports for a forest without background data: a missing feature is handled by
+# following both children, weighted by their share of the training rows (the
+# node "cover"). The values are exact Shapley values of that game, so they are
+# consistent and bias + sum(values) == P(potable).
+#
+# Per leaf, the splits on its path collapse to one entry per feature:
+#     zero[f]  product of cover(child) / cover(parent) over the path's splits on f
+#     lo[f], hi[f]  the interval lo < x[f] <= hi those splits leave open
+# (features not on the path: zero 1, interval unbounded). For a row, one[f] is
+# whether x[f] lies in the interval, and the leaf adds to feature i
+#     value * (one[i] - zero[i]) * sum_s W[s] * c_s
+# where c_s are the coefficients of prod_{f != i} (zero[f] + one[f] t) and
+# W[s] = s! (F - 1 - s)! / F!. That is the polynomial form of the TreeSHAP
+# recursion; features not on the path add a (1 + t) factor, which leaves the
+# others' values unchanged, so every leaf uses the same F slots.
+#
+# W[s] is the Beta integral of u^s (1 - u)^(F-1-s) over [0, 1], so the weighted
+# sum is the integral of prod_{f != i} (zero[f] (1 - u) + one[f] u): a
+# polynomial of degree F - 1, which Gauss-Legendre quadrature with
+# ceil(F / 2) nodes integrates exactly. At each node the product over all
+# features divided by feature i's own factor gives every feature's term in one
+# pass (the factors are > 0 inside the interval, since covers are positive).
+# The tables are built once at train time; explaining is a few float32 passes
+# over the leaves, with no per-node Python work.
+
+# Rows explained together; keeps the (rows x features x leaves) arrays small
+SHAP_ROW_BLOCK = 4
+
+
+def _positive_column(arrays: dict) -> int:
+    classes = list(np.asarray(arrays["classes"]))
+    return classes.index(1) if 1 in classes else len(classes) - 1
+
+
+def export_attributions(arrays: dict) -> dict:
+    """
+    Per-leaf TreeSHAP tables: "shap_value" (leaves,) P(potable), "shap_zero",
+    "shap_lo", "shap_hi" (features, leaves) float32, and "shap_bias", the
+    forest's expected P(potable). Needs the node covers from export_forest().
+    """
+    if "cover" not in arrays:
+        raise ValueError("The forest arrays have no node covers; retrain with train_model.py")
+    left, right, feature = arrays["left"], arrays["right"], arrays["feature"]
+    threshold = np.asarray(arrays["threshold"], dtype=np.float64)
+    cover = np.asarray(arrays["cover"], dtype=np.float64)
+    p = np.asarray(arrays["value"], dtype=np.float64)[:, _positive_column(arrays)]
+    n_nodes, n_features = len(left), len(arrays["impute"])
+    zero = np.ones((n_nodes, n_features))
+    lo = np.full((n_nodes, n_features), -np.inf)
+    hi = np.full((n_nodes, n_features), np.inf)
+
+    # Top-down, one tree level per step for all trees at once
+    roots = np.asarray(arrays["roots"], dtype=np.int64)
+    frontier = roots
+    leaves = []
+    while len(frontier):
+        internal = left[frontier] != frontier
+        leaves.append(frontier[~internal])
+        parents = frontier[internal]
+        f = feature[parents]
+        for children in (left[parents], right[parents]):
+            zero[children] = zero[parents]
+            lo[children] = lo[parents]
+            hi[children] = hi[parents]
+            zero[children, f] *= cover[children] / cover[parents]
+        hi[left[parents], f] = np.minimum(hi[parents, f], threshold[parents])
+        lo[right[parents], f] = np.maximum(lo[parents, f], threshold[parents])
+        frontier = np.concatenate([left[parents], right[parents]])
+    leaves = np.sort(np.concatenate(leaves))
+
+    return {
+        "shap_value": p[leaves],
+        # Feature-major, so every per-feature step below works on contiguous leaves
+        "shap_zero": np.ascontiguousarray(zero[leaves].T, dtype=np.float32),
+        # Rows are compared as float32, so rounding the bounds down is lossless
+        "shap_lo": np.ascontiguousarray(round_down_float32(lo[leaves].T)),
+        "shap_hi": np.ascontiguousarray(round_down_float32(hi[leaves].T)),
+        "shap_bias": float(p[roots].mean()),
+    }
+
+
+class TreeShapExplainer:
+    """Exact per-feature TreeSHAP values of P(potable) for a CompiledForest's arrays."""
+
+    def __init__(self, arrays: dict):
+        self.forest = CompiledForest(arrays)
+        if "shap_value" not in arrays:  # bundles saved before the tables existed
+            arrays = dict(arrays, **export_attributions(arrays))
+        self.value = (np.asarray(arrays["shap_value"], dtype=np.float64) / self.forest.n_trees).astype(np.float32)
+        self.zero = np.asarray(arrays["shap_zero"], dtype=np.float32)
+        self.lo = arrays["shap_lo"]
+        self.hi = arrays["shap_hi"]
+        self.bias = float(arrays["shap_bias"])
+        # Quadrature on [0, 1], exact for the degree F - 1 integrand
+        nodes, weights = np.polynomial.legendre.leggauss((self.forest.n_features_in_ + 1) // 2)
+        self.nodes = ((nodes + 1) / 2).astype(np.float32)
+        self.weights = (weights / 2).astype(np.float32)
+        # zero (1 - u) does not depend on the row
+        self.zero_scaled = [self.zero * (1 - u) for u in self.nodes]
+
+    def _explain_block(self, X32: np.ndarray) -> np.ndarray:
+        x = X32[:, :, None]
+        one = ((x > self.lo) & (x <= self.hi)).astype(np.float32)  # (rows, features, leaves)
+        integral = np.zeros_like(one)
+        factor = np.empty_like(one)
+        for u, w, zero_scaled in zip(self.nodes, self.weights, self.zero_scaled):
+            np.multiply(one, u, out=factor)
+            factor += zero_scaled
+            others = factor.prod(axis=1, keepdims=True)
+            others *= w
+            integral += np.divide(others, factor, out=factor)  # drop each feature's own factor
+        one -= self.zero
+        integral *= one
+        return integral @ self.value
+
+    def explain(self, X) -> np.ndarray:
+        """(rows, features) TreeSHAP values; bias + row sum == P(potable) up to rounding."""
+        X32 = self.forest._prepare(X)
+        out = np.empty((len(X32), self.forest.n_features_in_))
+        for start in range(0, len(X32), SHAP_ROW_BLOCK):
+            out[start:start + SHAP_ROW_BLOCK] = self._explain_block(X32[start:start + SHAP_ROW_BLOCK])
+        return out
+
+
+def explainer_from_bundle(bundle: dict) -> TreeShapExplainer:
+    arrays = bundle.get("compiled")
+    if arrays is None or ("shap_value" not in arrays and "cover" not in arrays):
+        # Bundles saved before TreeSHAP: only an unoptimized sklearn pipeline still has the node covers
+        if "optimizations" in bundle or not hasattr(bundle.get("model"), "steps"):
+            raise ValueError("This bundle has no node covers for TreeSHAP; retrain with train_model.py")
+        arrays = export_forest(bundle["model"])
+    return TreeShapExplainer(arrays)
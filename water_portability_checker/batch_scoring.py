@@ -0,0 +1,124 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Rows scored per predict_proba call
+CHUNK_SIZE = 50_000
+
+
+def get_final_estimator(m):
+    if hasattr(m, "steps"):  # Pipeline
+        return m.steps[-1][1]
+    return m
+
+
+def positive_class_index(model) -> int:
+    """Column of predict_proba that holds P(class=1 -> potable)."""
+    classes = list(getattr(get_final_estimator(model), "classes_", []))
+    return classes.index(1) if 1 in classes else -1
+
+
+def predict_with_proba(model, X: np.ndarray):
+    """
+    One predict_proba call for the whole block.
+    The class is the argmax of the probabilities, exactly what
+    RandomForestClassifier.predict does internally.
+    """
+    proba = model.predict_proba(X)
+    classes = np.asarray(get_final_estimator(model).classes_)
+    pred = classes.take(np.argmax(proba, axis=1))
+    return pred.astype(int), proba[:, positive_class_index(model)]
+
+
+def match_columns(columns, features):
+    """
+    Map CSV headers onto training feature names, case-insensitively
+    (the raw dataset uses 'Hardness', 'Organic_carbon', ...).
+    Returns {feature: csv_column}; raises ValueError if any are missing.
+    """
+    by_lower = {str(c).strip().lower().replace(" ", "_"): c for c in columns}
+    mapping, missing = {}, []
+    for f in features:
+        if f in by_lower:
+            mapping[f] = by_lower[f]
+        else:
+            missing.append(f)
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return mapping
+
+
+def score_frame(model, df: pd.DataFrame, features, rules, mapping: dict, explainer=None,
+                monitor=None, early_exit: bool = False) -> pd.DataFrame:
+    """
+    Score one chunk: a single vectorized model call plus one broadcasted rule check.
+    rules: a rules.RuleSet compiled for `features`.
+    explainer: optional attributions.TreeShapExplainer; adds one `{feature}_contrib` SHAP column per feature.
+    monitor: optional drift_monitor.DriftMonitor that sees every scored row.
+    early_exit: use the compiled forest's predict_early_exit(); same labels, and a
+    `trees_evaluated` column replaces `potable_prob`.
+    """
+    X = df[[mapping[f] for f in features]].to_numpy(dtype=float)
+    if monitor is not None:
+        monitor.update(X)
+    if early_exit:
+        pred, used = model.predict_early_exit(X)
+    else:
+        pred, prob = predict_with_proba(model, X)
+    ok, passed = rules.evaluate(X)
+
+    out = pd.DataFrame(X, columns=features, index=df.index)
+    for j, rule in enumerate(rules.rules):
+        out[f"{rule['feature']}_ok"] = ok[:, j]
+    out["checks_passed"] = passed
+    out["prediction"] = pred
+    if early_exit:
+        out["trees_evaluated"] = used
+    else:
+        out["potable_prob"] = prob
+    if explainer is not None:
+        contrib = explainer.explain(X)
+        for j, f in enumerate(features):
+            out[f"{f}_contrib"] = contrib[:, j]
+    return out
+
+
+def score_csv(model, source, features, rules, chunk_size: int = CHUNK_SIZE, progress=None, explainer=None,
+              monitor=None, early_exit: bool = False):
+    """
+    Stream a CSV (path or file-like) through the model chunk by chunk.
+    Yields (scored_chunk, rows_done). `progress(fraction)` is called per chunk
+    when the source exposes its size.
+    """
+    total = getattr(source, "size", None)
+    reader = pd.read_csv(source, chunksize=chunk_size)
+    mapping = None
+    rows_done = 0
+    for chunk in reader:
+        if mapping is None:
+            mapping = match_columns(chunk.columns, features)
+        scored = score_frame(model, chunk, features, rules, mapping, explainer, monitor, early_exit)
+        rows_done += len(scored)
+        if progress is not None and total:
+            progress(min(source.tell() / total, 1.0))
+        yield scored, rows_done
+
+
+def score_csv_to_file(model, source, out, features, rules, chunk_size: int = CHUNK_SIZE, progress=None,
+                      explainer=None, monitor=None, early_exit: bool = False):
+    """
+    Score a whole CSV into the text file `out` and return (rows, seconds, head).
+    Each scored chunk is written out and dropped before the next one is read,
+    so memory stays at one chunk on the output side as well as the input side.
+    """
+    head = None
+    rows = 0
+    t0 = time.perf_counter()
+    for scored, rows in score_csv(model, source, features, rules, chunk_size, progress, explainer, monitor,
+                                  early_exit):
+        scored.to_csv(out, header=head is None, index=False)
+        if head is None:
+            head = scored.head(20)
+    out.flush()
+    return rows, time.perf_counter() - t0, head
@@ -0,0 +1,238 @@
+"""
+Reproducible performance benchmarks for the potability model.
+
+    python benchmark.py                          # full run, writes benchmark_results.json
+    python benchmark.py --quick                  # smaller sizes / fewer repeats
+    python benchmark.py --save-baseline base.json
+    python benchmark.py --baseline base.json     # exit code 1 on regressions
+
+Covers CSV load + clean (binary cache and the old DataFrame path), upsampling, pipe.fit, bundle dump/load (pickle and mmap),
+single-row evaluate() latency and batch throughput, for both inference engines
+and for early-exit voting.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from batch_scoring import predict_with_proba
+from bundle_io import load_mmap_bundle, save_mmap_bundle
+from data_prep import balanced_arrays, legacy_balanced, load_clean
+from feature_schema import FEATURES
+from forest_engine import CompiledForest, export_forest
+from forest_optimize import early_exit_order
+from rules import get_rules
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, "water_potability.csv")
+RESULTS_PATH = os.path.join(BASE_DIR, "benchmark_results.json")
+
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+QUICK_BATCH_SIZES = [1, 100, 10_000]
+SEED = 42
+
+# Regression gate: the fastest of the repeats (least disturbed by other load) is
+# compared, and a slowdown must clear both the relative tolerance and this
+# absolute floor, so sub-millisecond jitter on tiny timings is not flagged
+NOISE_FLOOR_S = 0.001
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def timed(fn, repeats: int):
+    """Run fn `repeats` times; returns (last result, list of seconds)."""
+    times, result = [], None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, times
+
+
+def summarize(times) -> dict:
+    t = np.asarray(times)
+    return {"median_s": float(np.median(t)), "min_s": float(t.min()), "repeats": len(t)}
+
+
+# --- The same steps as train_model.py ---
+
+def load_and_clean():
+    return load_clean(CSV_PATH, report=None)
+
+
+def upsample(data):
+    X, y, _ = data
+    return balanced_arrays(X, y, SEED)
+
+
+def make_pipe():
+    return Pipeline([
+        ("imputer", SimpleImputer(strategy="mean")),
+        ("rf", RandomForestClassifier(random_state=SEED)),
+    ])
+
+
+def synthetic_rows(X_ref: np.ndarray, n: int) -> np.ndarray:
+    """n rows resampled from the real data with small noise, so trees take realistic paths."""
+    rng = np.random.default_rng(SEED)
+    rows = X_ref[rng.integers(0, len(X_ref), n)]
+    return rows * rng.normal(1.0, 0.02, size=rows.shape)
+
+
+def run(quick: bool = False, sizes=None) -> dict:
+    repeats = 7 if quick else 15
+    sizes = sizes or (QUICK_BATCH_SIZES if quick else BATCH_SIZES)
+    results = {}
+
+    def record(name, times, **extra):
+        results[name] = {**summarize(times), **extra}
+        print(f"{name:<40} median {results[name]['median_s'] * 1000:10.3f} ms  min {results[name]['min_s'] * 1000:10.3f} ms"
+              + "".join(f"  {k}={v:,.0f}" for k, v in extra.items() if isinstance(v, (int, float))))
+
+    # Old DataFrame sequence, for comparison with the shared data-prep module
+    _, t = timed(lambda: legacy_balanced(CSV_PATH), repeats)
+    record("load_clean_upsample_legacy", t)
+
+    clean, t = timed(load_and_clean, repeats)
+    record("csv_load_clean", t, rows=len(clean[1]))
+
+    (X_bal, y_bal), t = timed(lambda: upsample(clean), repeats)
+    record("upsample", t, rows=len(y_bal))
+
+    x_train, x_test, y_train, y_test = train_test_split(X_bal, y_bal, train_size=0.8, random_state=SEED)
+    pipe, t = timed(lambda: make_pipe().fit(x_train, y_train), 1 if quick else 3)
+    record("pipe_fit", t, rows=len(x_train))
+
+    compiled = export_forest(pipe)
+    bundle = {"model": pipe, "compiled": compiled, "features": FEATURES, "test_accuracy": None}
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl = os.path.join(tmp, "bench.pkl")
+        _, t = timed(lambda: joblib.dump(bundle, pkl), repeats)
+        record("bundle_dump_pickle", t, bytes=os.path.getsize(pkl))
+        _, t = timed(lambda: joblib.load(pkl), repeats)
+        record("bundle_load_pickle", t)
+
+        mm = os.path.join(tmp, "bench.bundle")
+        _, t = timed(lambda: save_mmap_bundle(mm, compiled, {"features": FEATURES}), repeats)
+        record("bundle_dump_mmap", t, bytes=sum(os.path.getsize(os.path.join(mm, f)) for f in os.listdir(mm)))
+        _, t = timed(lambda: load_mmap_bundle(mm), repeats)
+        record("bundle_load_mmap", t)
+
+    engines = {"sklearn": pipe, "compiled": CompiledForest(compiled)}
+    early_exit = CompiledForest(dict(compiled, tree_order=early_exit_order(compiled, x_train)))
+    rules = get_rules(FEATURES)
+    X_ref = X_bal.astype(float)
+    single = X_ref[:1]
+
+    # Single-row evaluate(): vector build + rule checks + one model call, as in the app
+    for name, predictor in engines.items():
+        def evaluate_once():
+            X = np.array([list(single[0])], dtype=float)
+            rules.describe(X[0])
+            return predict_with_proba(predictor, X)
+
+        evaluate_once()  # warm-up
+        _, t = timed(evaluate_once, 50 if quick else 200)
+        results[f"evaluate_single_{name}"] = {
+            **summarize(t),
+            "p99_s": float(np.percentile(t, 99)),
+        }
+        print(f"{'evaluate_single_' + name:<40} median {np.median(t) * 1000:10.3f} ms  p99 {np.percentile(t, 99) * 1000:.3f} ms")
+
+    for n in sizes:
+        X = synthetic_rows(X_ref, n)
+        for name, predictor in engines.items():
+            _, t = timed(lambda: predict_with_proba(predictor, X), 1 if n >= 1_000_000 else repeats)
+            record(f"batch_{name}_{n}", t, rows=n, rows_per_s=n / float(np.min(t)))
+        # Labels only, stopping once the majority is settled
+        (_, used), t = timed(lambda: early_exit.predict_early_exit(X), 1 if n >= 1_000_000 else repeats)
+        record(f"batch_compiled_early_exit_{n}", t, rows=n, rows_per_s=n / float(np.min(t)),
+               mean_trees=float(used.mean()))
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, floor: float = NOISE_FLOOR_S) -> list:
+    """Regressions as (name, metric, baseline, current, ratio), on min_s."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        base_t, cur_t = base.get("min_s"), cur.get("min_s")
+        if not base_t or cur_t is None:
+            continue
+        ratio = cur_t / base_t
+        if ratio > 1 + tolerance and cur_t - base_t > floor:
+            regressions.append((name, "min_s", base_t, cur_t, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Potability model benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller batch sizes and fewer repeats")
+    parser.add_argument("--sizes", type=int, nargs="+", help="batch sizes to measure")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--noise-floor-ms", type=float, default=NOISE_FLOOR_S * 1000,
+                        help="slowdowns smaller than this are never flagged")
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "quick": args.quick, "results": run(args.quick, args.sizes)}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved: {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment", {}).get("machine") != report["environment"]["machine"]:
+            print("Warning: baseline was recorded on a different machine type")
+        regressions = compare(report["results"], baseline, args.tolerance, args.noise_floor_ms / 1000)
+        for name, metric, base, cur, ratio in regressions:
+            print(f"REGRESSION {name} {metric}: {base:.6g} -> {cur:.6g} ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
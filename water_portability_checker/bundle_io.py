@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+from forest_engine import CompiledForest
+
+# ------------------------------
+# Bundle formats
+# ------------------------------
+# "pickle": water_potability_rf.pkl, a joblib dump of {"model": Pipeline, ...}.
+#           Every process that loads it gets its own private copy of the forest.
+# "mmap":   water_potability_rf.bundle/, a directory with one uncompressed .npy
+#           per compiled-forest array plus meta.json (features, test_accuracy,
+#           scalars, per-array sha256). Arrays are opened with mmap_mode="r",
+#           so all processes share the same page-cache pages and a cold load
+#           only reads meta.json.
+
+PICKLE_FILE_NAME = "water_potability_rf.pkl"
+MMAP_DIR_NAME = "water_potability_rf.bundle"
+META_FILE_NAME = "meta.json"
+MMAP_FORMAT = "mmap-v1"
+
+
+def is_mmap_bundle(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE_NAME))
+
+
+def save_mmap_bundle(path: str, compiled: dict, metadata: dict):
+    """
+    Write compiled-forest arrays as separate .npy files next to a meta.json sidecar.
+    The directory is built under a temporary name and swapped in at the end, so a
+    reader never sees a half-written bundle; processes still mapping the old files
+    keep working because unlinked files stay valid while mapped.
+    """
+    path = os.path.abspath(path)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    arrays, scalars = {}, {}
+    for name, value in compiled.items():
+        if isinstance(value, np.ndarray):
+            arr = np.ascontiguousarray(value)
+            np.save(os.path.join(tmp, f"{name}.npy"), arr, allow_pickle=False)
+            arrays[name] = hashlib.sha256(arr.tobytes()).hexdigest()
+        else:
+            scalars[name] = value
+
+    meta = dict(metadata)
+    meta.update({"format": MMAP_FORMAT, "arrays": arrays, "scalars": scalars})
+    # meta.json is written last; its hash covers every array via the digests above
+    with open(os.path.join(tmp, META_FILE_NAME), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    old = None
+    if os.path.exists(path):
+        old = f"{path}.old-{os.getpid()}"
+        os.replace(path, old)
+    os.replace(tmp, path)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_mmap_bundle(path: str) -> dict:
+    """Open an mmap bundle; returns the same dict shape as the pickle bundle."""
+    with open(os.path.join(path, META_FILE_NAME)) as f:
+        meta = json.load(f)
+    if meta.get("format") != MMAP_FORMAT:
+        raise ValueError(f"Unsupported bundle format: {meta.get('format')}")
+
+    compiled = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in meta["arrays"]}
+    compiled.update(meta["scalars"])
+
+    bundle = {k: v for k, v in meta.items() if k not in ("arrays", "scalars")}
+    bundle["compiled"] = compiled
+    # No sklearn objects in this format: the compiled engine is the model
+    bundle["model"] = CompiledForest(compiled)
+    return bundle
+
+
+def load_any(path: str) -> dict:
+    if is_mmap_bundle(path):
+        return load_mmap_bundle(path)
+    return joblib.load(path)
+
+
+def stamp_path(path: str) -> str:
+    """File whose mtime/hash identifies the bundle version."""
+    return os.path.join(path, META_FILE_NAME) if is_mmap_bundle(path) else path
+
+
+def resolve_model_path(base_dir: str) -> str:
+    """
+    Prefer the mmap bundle when it is at least as new as the pickle,
+    so re-training in only one format never leaves the apps on a stale model.
+    """
+    pkl = os.path.join(base_dir, PICKLE_FILE_NAME)
+    mmap_dir = os.path.join(base_dir, MMAP_DIR_NAME)
+    if is_mmap_bundle(mmap_dir):
+        if not os.path.exists(pkl) or os.path.getmtime(stamp_path(mmap_dir)) >= os.path.getmtime(pkl):
+            return mmap_dir
+    return pkl
@@ -0,0 +1,115 @@
+import tracemalloc
+
+import numpy as np
+
+from data_cache import TARGET, load_dataset
+
+# ------------------------------
+# Shared data preparation for train_model.py and test_data_upsample.py
+# ------------------------------
+# Works on plain arrays instead of chained DataFrames: mean imputation is done
+# in place, balancing only builds an index array (minority drawn with
+# replacement, then shuffled) and rows are gathered once at the end.
+# balanced_class_weight() is the zero-copy alternative: no duplicated rows,
+# the forest reweights the classes instead.
+
+SEED = 42
+
+
+def load_clean(csv_path: str, report=print):
+    """(X float32, y int8, feature column names) with NaNs replaced by column means."""
+    df = load_dataset(csv_path, report=report)
+    feature_cols = [c for c in df.columns if c != TARGET]
+    X = df[feature_cols].to_numpy(copy=True)  # the one writable feature matrix
+    y = df[TARGET].to_numpy()
+    del df
+    means = np.nanmean(X, axis=0)
+    rows, cols = np.nonzero(np.isnan(X))
+    X[rows, cols] = means[cols]
+    return X, y, feature_cols
+
+
+def balanced_indices(y: np.ndarray, random_state: int = SEED) -> np.ndarray:
+    """
+    Row order of the upsampled, shuffled dataset. Draws the same rows as
+    sklearn.utils.resample + DataFrame.sample(frac=1) with the same seed,
+    so models trained on it match the old pipeline.
+    """
+    classes, counts = np.unique(y, return_counts=True)
+    maj_class = classes[np.argmax(counts)]
+    min_class = classes[np.argmin(counts)]
+    maj_idx = np.flatnonzero(y == maj_class)
+    min_idx = np.flatnonzero(y == min_class)
+
+    # resample(replace=True, n_samples=len(majority)) == randint over the minority rows
+    rng = np.random.RandomState(random_state)
+    min_up_idx = min_idx[rng.randint(0, len(min_idx), size=len(maj_idx))]
+
+    order = np.concatenate([maj_idx, min_up_idx])
+    # DataFrame.sample(frac=1, random_state=seed) draws a permutation this way
+    perm = np.random.RandomState(random_state).choice(len(order), size=len(order), replace=False)
+    return order[perm]
+
+
+def balanced_arrays(X: np.ndarray, y: np.ndarray, random_state: int = SEED):
+    """Upsampled X, y gathered in one pass."""
+    idx = balanced_indices(y, random_state)
+    return X[idx], y[idx]
+
+
+def balanced_class_weight(y: np.ndarray) -> dict:
+    """class_weight for the forest; same formula as class_weight='balanced'."""
+    classes, counts = np.unique(y, return_counts=True)
+    return class_weight_from_counts(dict(zip(classes, counts)))
+
+
+def class_weight_from_counts(class_counts: dict) -> dict:
+    """balanced_class_weight() from {class: rows}, for callers that only have the counts."""
+    total = sum(class_counts.values())
+    return {int(c): float(total / (len(class_counts) * n)) for c, n in class_counts.items()}
+
+
+def legacy_balanced(csv_path: str):
+    """The old copy-heavy DataFrame sequence, kept only to measure against."""
+    import pandas as pd
+    from sklearn.utils import resample
+
+    df_water = pd.read_csv(csv_path)
+    df_clean = df_water.fillna(df_water.mean())
+    x = df_clean[list(df_clean.columns)[0: -1]]
+    y = df_clean[TARGET]
+    df_upsampling = pd.concat([x, y], axis=1)
+    class_counts = df_upsampling[TARGET].value_counts()
+    df_majority = df_upsampling[df_upsampling[TARGET] == class_counts.idxmax()]
+    df_minority = df_upsampling[df_upsampling[TARGET] == class_counts.idxmin()]
+    df_minority_upsampled = resample(df_minority, replace=True, n_samples=len(df_majority), random_state=SEED)
+    df_balanced = pd.concat([df_majority, df_minority_upsampled])
+    df_balanced = df_balanced.sample(frac=1, random_state=SEED).reset_index(drop=True)
+    return df_balanced.iloc[:, :-1], df_balanced[TARGET]
+
+
+def peak_memory(fn, *args) -> int:
+    """Peak bytes allocated (tracemalloc) while running fn(*args)."""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare_peak_memory(csv_path: str) -> dict:
+    def upsample():
+        X, y, _ = load_clean(csv_path, report=None)
+        return balanced_arrays(X, y)
+
+    def class_weight():
+        X, y, _ = load_clean(csv_path, report=None)
+        return X, y, balanced_class_weight(y)
+
+    load_dataset(csv_path, report=None)  # make sure the cache exists before measuring
+    return {
+        "legacy_dataframes": peak_memory(legacy_balanced, csv_path),
+        "index_upsample": peak_memory(upsample),
+        "class_weight": peak_memory(class_weight),
+    }
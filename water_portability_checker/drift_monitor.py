@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# ------------------------------
+# Constant-memory input drift monitoring
+# ------------------------------
+# train_model.py stores a per-feature reference profile in the bundle: mean,
+# std, missing rate and a histogram over quantile bin edges of the training
+# data. DriftMonitor keeps only running aggregates of the vectors it sees
+# (Welford mean/variance, one count per bin, a missing count), so memory is
+# features x bins no matter how many requests arrive, and no raw request is
+# kept. Drift per feature:
+#   psi   - population stability index of the live histogram vs the reference
+#   shift - live mean minus reference mean, in reference standard deviations
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DRIFT_PATH = os.environ.get("POTABILITY_DRIFT_PATH", os.path.join(BASE_DIR, "potability_drift.json"))
+
+REFERENCE_BINS = 10
+MIN_SAMPLES = 30          # below this, scores are reported as "warming up"
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+_EPS = 1e-4               # floor for empty bins in the PSI
+
+
+def reference_profile(X, features, bins: int = REFERENCE_BINS) -> dict:
+    """
+    JSON-friendly reference statistics of the training rows (NaN = missing).
+    Bin edges are training quantiles, so each reference bin holds ~1/bins of the rows;
+    the outer bins are open-ended.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    profile = {"bins": bins, "rows": int(len(X)), "features": {}}
+    for j, name in enumerate(features):
+        col = X[:, j]
+        present = col[~np.isnan(col)]
+        edges = np.unique(np.quantile(present, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, present, side="right"), minlength=len(edges) + 1)
+        profile["features"][name] = {
+            "mean": float(present.mean()),
+            "std": float(present.std()),
+            "missing_rate": float(1 - len(present) / len(col)),
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+        }
+    return profile
+
+
+def psi(expected, actual) -> float:
+    expected = np.maximum(np.asarray(expected, dtype=float), _EPS)
+    actual = np.maximum(np.asarray(actual, dtype=float), _EPS)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DriftMonitor:
+    """Running statistics of incoming feature vectors against a reference_profile()."""
+
+    def __init__(self, reference: dict, features):
+        self.reference = reference
+        self.features = list(features)
+        ref = [reference["features"][f] for f in self.features]
+        self.ref_mean = np.array([r["mean"] for r in ref])
+        self.ref_std = np.array([r["std"] for r in ref])
+        self.ref_missing = np.array([r["missing_rate"] for r in ref])
+        self.edges = [np.asarray(r["edges"]) for r in ref]
+        self.ref_props = [np.asarray(r["proportions"]) for r in ref]
+
+        n = len(self.features)
+        self._lock = threading.Lock()
+        self.count = np.zeros(n)           # non-missing values seen
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.missing = np.zeros(n)
+        self.rows = 0
+        self.hist = [np.zeros(len(e) + 1) for e in self.edges]
+        self._last_export = 0.0
+
+    @classmethod
+    def from_bundle(cls, bundle: dict):
+        """None for bundles trained before reference profiles were stored."""
+        reference = bundle.get("reference")
+        return cls(reference, bundle["features"]) if reference else None
+
+    def update(self, X):
+        """Fold a (rows, features) block into the running statistics; X itself is not kept."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        present = ~np.isnan(X)
+        n_b = present.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(n_b > 0, np.nansum(X, axis=0) / np.maximum(n_b, 1), 0.0)
+            m2_b = np.nansum((X - mean_b) ** 2, axis=0)
+
+        with self._lock:
+            # Chan et al. parallel combination of (count, mean, M2); one row reduces to Welford
+            n_a = self.count
+            total = n_a + n_b
+            delta = mean_b - self.mean
+            safe = np.maximum(total, 1)
+            self.mean = self.mean + delta * n_b / safe
+            self.m2 = self.m2 + m2_b + delta ** 2 * n_a * n_b / safe
+            self.count = total
+            self.missing += len(X) - n_b
+            self.rows += len(X)
+            for j, edges in enumerate(self.edges):
+                col = X[present[:, j], j]
+                self.hist[j] += np.bincount(np.searchsorted(edges, col, side="right"), minlength=len(edges) + 1)
+
+    def scores(self) -> list:
+        """[{feature, n, mean, ref_mean, shift, psi, missing_rate, status}] in feature order."""
+        with self._lock:
+            count, mean, m2 = self.count.copy(), self.mean.copy(), self.m2.copy()
+            missing, rows = self.missing.copy(), self.rows
+            hist = [h.copy() for h in self.hist]
+
+        out = []
+        for j, f in enumerate(self.features):
+            n = int(count[j])
+            std = self.ref_std[j] if self.ref_std[j] > 0 else 1.0
+            p = psi(self.ref_props[j], hist[j] / n) if n else None
+            if n < MIN_SAMPLES:
+                status = "warming up"
+            elif p >= PSI_SIGNIFICANT:
+                status = "drift"
+            elif p >= PSI_MODERATE:
+                status = "watch"
+            else:
+                status = "stable"
+            out.append({
+                "feature": f,
+                "n": n,
+                "mean": float(mean[j]) if n else None,
+                "std": float(np.sqrt(m2[j] / n)) if n else None,
+                "ref_mean": float(self.ref_mean[j]),
+                "shift": float((mean[j] - self.ref_mean[j]) / std) if n else None,
+                "psi": p,
+                "missing_rate": float(missing[j] / rows) if rows else None,
+                "ref_missing_rate": float(self.ref_missing[j]),
+                "status": status,
+            })
+        return out
+
+    def export(self, path: str = DRIFT_PATH, min_interval: float = 5.0, model_version=None) -> bool:
+        """Write the current scores as JSON at most every `min_interval` seconds (atomic rename)."""
+        now = time.monotonic()
+        with self._lock:  # one writer per interval, however many threads call in
+            if now - self._last_export < min_interval:
+                return False
+            self._last_export = now
+        report = {
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model_version": model_version,
+            "rows": self.rows,
+            "features": self.scores(),
+        }
+        # Unique temp name in the target dir: concurrent writers never share a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".tmp-")
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, "w") as f:
+                json.dump(report, f, indent=2)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return True
@@ -0,0 +1,46 @@
+from typing import Dict, List
+
+# ------------------------------
+# Shared feature schema for the apps and the HTTP service
+# ------------------------------
+
+# Training feature order (lowercase); the bundle carries its own copy
+FEATURES: List[str] = [
+    "ph",
+    "hardness",
+    "solids",
+    "chloramines",
+    "sulfate",
+    "conductivity",
+    "organic_carbon",
+    "trihalomethanes",
+    "turbidity",
+]
+
+# Map UI keys -> training feature names
+UI_TO_FEATURE: Dict[str, str] = {
+    "pH": "ph",
+    "Hardness": "hardness",
+    "Solids": "solids",
+    "Chloramines": "chloramines",
+    "Sulfate": "sulfate",
+    "Conductivity": "conductivity",
+    "Organic Carbon": "organic_carbon",
+    "Trihalomethanes": "trihalomethanes",
+    "Turbidity": "turbidity",
+}
+
+
+def row_to_vector(row: dict, features: List[str]) -> List[float]:
+    """
+    Accepts either UI keys ('Organic Carbon') or feature names ('organic_carbon'),
+    in any case. Missing or null values become NaN and are imputed by the model.
+    """
+    by_feature = {}
+    for k, v in row.items():
+        name = UI_TO_FEATURE.get(k, str(k).strip().lower().replace(" ", "_"))
+        by_feature[name] = float("nan") if v is None else float(v)
+    unknown = set(by_feature) - set(features)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [by_feature.get(f, float("nan")) for f in features]
@@ -0,0 +1,190 @@
+import numpy as np
+
+# ------------------------------
+# Compiled NumPy inference for the SimpleImputer -> RandomForestClassifier pipeline
+# ------------------------------
+# export_forest() flattens every tree of the fitted forest into one set of
+# contiguous node arrays; CompiledForest walks all trees for all rows at once,
+# one tree level per step, so a single row costs a few dozen small NumPy ops
+# instead of the Pipeline/joblib per-call overhead.
+
+# Rows traversed together; keeps the (rows x trees) node index matrix small
+ROW_BLOCK = 8192
+# Trees evaluated between two early-exit checks
+EARLY_EXIT_BLOCK = 10
+
+
+def export_forest(pipe) -> dict:
+    """
+    Flatten a fitted Pipeline(imputer, rf) (or a bare forest) into plain arrays.
+    All trees share one node table; `roots[t]` is where tree t starts.
+    """
+    if hasattr(pipe, "steps"):
+        imputer = pipe.steps[0][1] if len(pipe.steps) > 1 else None
+        rf = pipe.steps[-1][1]
+    else:
+        imputer, rf = None, pipe
+
+    features, thresholds, left, right, values, covers, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for est in rf.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        leaf = tree.children_left == -1
+        idx = np.arange(n)
+
+        # Leaves point at themselves so extra traversal steps are no-ops
+        left.append(np.where(leaf, idx, tree.children_left) + offset)
+        right.append(np.where(leaf, idx, tree.children_right) + offset)
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+        # Weighted training rows per node, for TreeSHAP (attributions.py)
+        covers.append(tree.weighted_n_node_samples)
+
+        roots.append(offset)
+        depths.append(tree.max_depth)
+        offset += n
+
+    n_features = rf.n_features_in_
+    if imputer is not None:
+        impute = np.asarray(imputer.statistics_, dtype=np.float64)
+    else:
+        impute = np.full(n_features, np.nan)
+
+    return {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(values),
+        "cover": np.concatenate(covers).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "impute": impute,
+        "classes": np.asarray(rf.classes_),
+        "max_depth": int(max(depths)),
+    }
+
+
+class CompiledForest:
+    """
+    Drop-in replacement for the fitted pipeline's predict / predict_proba,
+    built from export_forest() arrays. Outputs are bit-identical to sklearn:
+    rows are imputed in float64, cast to float32 like the tree code does, and
+    per-tree probabilities are summed in tree order before dividing.
+    """
+
+    model_name = "CompiledForest"
+
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.impute = arrays["impute"]
+        self.classes_ = np.asarray(arrays["classes"])
+        self.max_depth = int(arrays["max_depth"])
+        self.n_trees = len(self.roots)
+        self.n_features_in_ = len(self.impute)
+        # Evaluation order for early-exit voting, chosen at training time (most decisive trees first)
+        order = arrays.get("tree_order")
+        self.tree_order = np.arange(self.n_trees) if order is None else np.asarray(order)
+
+    def _prepare(self, X) -> np.ndarray:
+        X = np.array(X, dtype=np.float64, copy=True)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        missing = np.isnan(X)
+        if missing.any():
+            X[missing] = np.broadcast_to(self.impute, X.shape)[missing]
+        return X.astype(np.float32)
+
+    def apply(self, X32: np.ndarray, trees=None) -> np.ndarray:
+        """Leaf node index for every (row, tree); X32 must already be prepared."""
+        roots = self.roots if trees is None else self.roots[trees]
+        n_rows, n_cols = X32.shape
+        flat_x = X32.ravel()
+        node = np.tile(roots, n_rows)
+        base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_cols, len(roots))
+        # Only (row, tree) pairs still sitting on an internal node are advanced
+        active = np.arange(len(node))
+        for _ in range(self.max_depth):
+            cur = node[active]
+            go_left = flat_x[base[active] + self.feature[cur]] <= self.threshold[cur]
+            nxt = np.where(go_left, self.left[cur], self.right[cur])
+            moved = nxt != cur
+            node[active] = nxt
+            active = active[moved]
+            if not len(active):
+                break
+        return node.reshape(n_rows, len(roots))
+
+    def predict_proba(self, X) -> np.ndarray:
+        X32 = self._prepare(X)
+        out = np.empty((len(X32), len(self.classes_)))
+        for start in range(0, len(X32), ROW_BLOCK):
+            leaves = self.apply(X32[start:start + ROW_BLOCK])
+            leaf_values = self.value[leaves]  # (rows, trees, classes)
+            acc = np.zeros((len(leaves), len(self.classes_)))
+            for t in range(self.n_trees):
+                acc += leaf_values[:, t]
+            out[start:start + ROW_BLOCK] = acc / self.n_trees
+        return out
+
+    def predict_with_proba(self, X):
+        """Class labels and full probability matrix from one traversal."""
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1)), proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_with_proba(X)[0]
+
+    def predict_early_exit(self, X, confidence=None, block: int = EARLY_EXIT_BLOCK):
+        """
+        Class labels from trees evaluated in `tree_order`: just over half the
+        forest first (nothing can be settled earlier), then `block` trees at a time.
+        A row stops once the remaining trees cannot change its majority: each tree
+        moves the gap between two classes by at most 1, so a lead larger than the
+        number of trees left is final and the label equals predict().
+        With `confidence` (e.g. 0.99) a row also stops when the mean per-tree lead
+        clears a Hoeffding bound at that level; such labels are not guaranteed to
+        match predict(). Returns (labels, trees evaluated per row).
+        """
+        X32 = self._prepare(X)
+        sums = np.zeros((len(X32), len(self.classes_)))
+        used = np.zeros(len(X32), dtype=np.int32)
+        active = np.arange(len(X32))
+        # No majority can be final before more than half the trees have voted
+        first = block if confidence is not None else min(self.n_trees // 2 + 1, self.n_trees)
+        starts = [0] + list(range(first, self.n_trees, block))
+        for start, stop in zip(starts, starts[1:] + [self.n_trees]):
+            trees = self.tree_order[start:stop]
+            leaves = self.apply(X32[active], trees)
+            sums[active] += self.value[leaves].sum(axis=1)
+            used[active] = stop
+
+            top = np.sort(sums[active], axis=1)
+            lead = top[:, -1] - top[:, -2] if top.shape[1] > 1 else np.full(len(active), np.inf)
+            decided = lead > self.n_trees - stop
+            if confidence is not None:
+                decided |= lead / stop > np.sqrt(2.0 * np.log(2.0 / (1.0 - confidence)) / stop)
+            active = active[~decided]
+            if not len(active):
+                break
+        return self.classes_.take(np.argmax(sums, axis=1)), used
+
+
+def compiled_from_bundle(bundle: dict) -> CompiledForest:
+    """Use the arrays saved by train_model.py, or flatten older bundles on the fly."""
+    arrays = bundle.get("compiled")
+    if arrays is None:
+        arrays = export_forest(bundle["model"])
+    return CompiledForest(arrays)
@@ -0,0 +1,225 @@
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from bundle_io import load_mmap_bundle, save_mmap_bundle
+from forest_engine import CompiledForest
+
+# ------------------------------
+# Post-training size/latency optimizations on export_forest() arrays
+# ------------------------------
+# cap_depth():     nodes at the depth cap become leaves; they already carry the
+#                  class distribution of their subtree, so no refit is needed.
+# prune_trees():   keep the trees that score best on their own out-of-bag rows.
+# to_float32():    thresholds rounded *down* to float32, which is lossless
+#                  because rows are compared as float32 anyway; leaf values in
+#                  float32 (probabilities can move in the 8th digit).
+# Unreachable nodes are dropped after every step, so the arrays actually shrink.
+
+
+def node_depths(arrays: dict) -> np.ndarray:
+    """Depth of every node reachable from a root, -1 for unreachable nodes."""
+    left, right = arrays["left"], arrays["right"]
+    depth = np.full(len(left), -1, dtype=np.int32)
+    frontier = np.asarray(arrays["roots"], dtype=np.int64)
+    d = 0
+    while len(frontier):
+        depth[frontier] = d
+        internal = frontier[left[frontier] != frontier]
+        frontier = np.concatenate([left[internal], right[internal]])
+        d += 1
+    return depth
+
+
+def _compact(arrays: dict, roots: np.ndarray, leaf_mask=None) -> dict:
+    """
+    Copy of `arrays` with only the nodes reachable from `roots`.
+    Nodes in `leaf_mask` are turned into leaves first.
+    """
+    left = np.array(arrays["left"])
+    right = np.array(arrays["right"])
+    feature = np.array(arrays["feature"])
+    if leaf_mask is not None:
+        idx = np.flatnonzero(leaf_mask)
+        left[idx] = right[idx] = idx
+        feature[idx] = 0
+
+    tmp = dict(arrays, left=left, right=right, roots=np.asarray(roots))
+    depth = node_depths(tmp)
+    keep = depth >= 0
+    new_index = (np.cumsum(keep) - 1).astype(np.int32)
+
+    # Tree ids and node values change: order and attributions are rebuilt after optimizing
+    out = {k: v for k, v in arrays.items() if k != "tree_order" and not k.startswith("shap_")}
+    out.update({
+        "feature": feature[keep],
+        "threshold": np.asarray(arrays["threshold"])[keep],
+        "left": new_index[left[keep]],
+        "right": new_index[right[keep]],
+        "value": np.asarray(arrays["value"])[keep],
+        "roots": new_index[np.asarray(roots)],
+        "max_depth": int(depth.max()),
+    })
+    if "cover" in arrays:
+        out["cover"] = np.asarray(arrays["cover"])[keep]
+    return out
+
+
+def cap_depth(arrays: dict, max_depth: int) -> dict:
+    depth = node_depths(arrays)
+    return _compact(arrays, arrays["roots"], leaf_mask=depth == max_depth)
+
+
+def tree_scores(arrays: dict, X, y, samples=None) -> np.ndarray:
+    """
+    Accuracy of every tree on its own. With `samples` (the forest's in-bag row
+    indices per tree) each tree is scored only on the rows it never saw.
+    """
+    forest = CompiledForest(arrays)
+    X32 = forest._prepare(X)
+    y = np.asarray(y)
+    scores = np.empty(forest.n_trees)
+    for t in range(forest.n_trees):
+        rows = np.arange(len(y))
+        if samples is not None:
+            rows = np.setdiff1d(rows, samples[t], assume_unique=False)
+        if not len(rows):
+            rows = np.arange(len(y))
+        leaves = forest.apply(X32[rows], trees=[t])[:, 0]
+        pred = forest.classes_.take(np.argmax(forest.value[leaves], axis=1))
+        scores[t] = np.mean(pred == y[rows])
+    return scores
+
+
+def early_exit_order(arrays: dict, X) -> np.ndarray:
+    """
+    Tree order for early-exit voting: trees that put the most probability on the
+    forest's own final class come first, so majorities are settled sooner.
+    """
+    forest = CompiledForest(arrays)
+    X32 = forest._prepare(X)
+    leaves = forest.apply(X32)  # (rows, trees)
+    final = np.argmax(forest.predict_proba(X), axis=1)
+    support = forest.value[leaves, final[:, None]].mean(axis=0)
+    return np.argsort(-support, kind="stable").astype(np.int32)
+
+
+def prune_trees(arrays: dict, scores: np.ndarray, keep) -> dict:
+    """Keep the `keep` best-scoring trees (an int, or a fraction of the forest), in original order."""
+    n_trees = len(arrays["roots"])
+    n_keep = int(round(keep * n_trees)) if isinstance(keep, float) and keep < 1 else int(keep)
+    n_keep = min(max(n_keep, 1), n_trees)
+    kept = np.sort(np.argsort(-np.asarray(scores), kind="stable")[:n_keep])
+    return _compact(arrays, np.asarray(arrays["roots"])[kept])
+
+
+def round_down_float32(threshold) -> np.ndarray:
+    """x32 <= t64  <=>  x32 <= largest float32 not above t64 (same for >)."""
+    threshold = np.asarray(threshold, dtype=np.float64)
+    t32 = threshold.astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+def to_float32(arrays: dict) -> dict:
+    out = {k: v for k, v in arrays.items() if not k.startswith("shap_")}
+    out["threshold"] = round_down_float32(arrays["threshold"])
+    out["value"] = np.asarray(arrays["value"], dtype=np.float32)
+    return out
+
+
+def optimize(arrays: dict, max_depth=None, keep_trees=None, float32=False,
+             X=None, y=None, samples=None):
+    """
+    Apply the requested optimizations in order depth cap -> pruning -> float32.
+    Pruning scores the (already capped) trees on X, y; pass the forest's in-bag
+    `samples` so each tree is judged on out-of-bag rows.
+    Returns (arrays, optimizations); `optimizations` is the JSON-friendly
+    record stored in the bundle.
+    """
+    optimizations = {}
+    n_original = len(arrays["roots"])
+    if max_depth is not None and max_depth < arrays["max_depth"]:
+        arrays = cap_depth(arrays, max_depth)
+        optimizations["max_depth"] = int(max_depth)
+    if keep_trees is not None:
+        if X is None or y is None:
+            raise ValueError("Tree pruning needs rows to score the trees on")
+        arrays = prune_trees(arrays, tree_scores(arrays, X, y, samples), keep_trees)
+        if len(arrays["roots"]) < n_original:
+            optimizations["trees"] = [len(arrays["roots"]), n_original]
+    if float32:
+        arrays = to_float32(arrays)
+        optimizations["float32"] = True
+    return arrays, optimizations
+
+
+def describe_optimizations(optimizations) -> str:
+    """Short label for the apps, e.g. 'depth<=12, 50/100 trees, float32'."""
+    if not optimizations:
+        return ""
+    parts = []
+    if "max_depth" in optimizations:
+        parts.append(f"depth<={optimizations['max_depth']}")
+    if "trees" in optimizations:
+        kept, total = optimizations["trees"]
+        parts.append(f"{kept}/{total} trees")
+    if optimizations.get("float32"):
+        parts.append("float32")
+    return ", ".join(parts)
+
+
+def _dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def measure_variant(bundle: dict, X_test, y_test, repeats: int = 200) -> dict:
+    """
+    Size and load time of both bundle formats, single-row latency and test accuracy.
+    Every variant is pickled with the compiled engine as its model (what an
+    optimized bundle ships), so the baseline row does not carry the sklearn
+    pipeline and the pickle columns compare like with like.
+    """
+    compiled = bundle["compiled"]
+    forest = CompiledForest(compiled)
+    row = np.asarray(X_test[:1], dtype=float)
+    forest.predict_proba(row)  # warm-up
+    lat = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        forest.predict_proba(row)
+        lat.append(time.perf_counter() - t0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl = os.path.join(tmp, "variant.pkl")
+        joblib.dump(dict(bundle, model=forest), pkl)
+        t0 = time.perf_counter()
+        joblib.load(pkl)
+        pickle_load = time.perf_counter() - t0
+
+        mm = os.path.join(tmp, "variant.bundle")
+        save_mmap_bundle(mm, compiled, {})
+        t0 = time.perf_counter()
+        loaded = load_mmap_bundle(mm)
+        mmap_load = time.perf_counter() - t0
+        # The mmap engine faults pages in lazily; a first prediction is part of the real cold cost
+        t0 = time.perf_counter()
+        loaded["model"].predict_proba(row)
+        mmap_first = time.perf_counter() - t0
+        sizes = (os.path.getsize(pkl), _dir_bytes(mm))
+
+    return {
+        "nodes": int(len(compiled["feature"])),
+        "trees": int(len(compiled["roots"])),
+        "max_depth": int(compiled["max_depth"]),
+        "pickle_mb": sizes[0] / 2**20,
+        "mmap_mb": sizes[1] / 2**20,
+        "pickle_load_ms": pickle_load * 1000,
+        "mmap_load_ms": (mmap_load + mmap_first) * 1000,
+        "single_row_ms": float(np.median(lat)) * 1000,
+        "accuracy": float(np.mean(forest.predict(X_test) == np.asarray(y_test))),
+    }
@@ -0,0 +1,183 @@
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import product
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from forest_engine import CompiledForest, export_forest
+
+# ------------------------------
+# Parallel random search with k-fold CV and early stopping
+# ------------------------------
+# Every (config, fold) fit is one task in a process pool. Each config first gets
+# fold 0 only; configs that land in the bottom part of that first round are
+# pruned, the survivors get the remaining folds. Nothing new is started after
+# the wall-clock budget runs out; fits already running are waited for (and
+# kept), so the reported wall time is what the search really cost.
+#
+# The data and the fold indices are sent to each worker once, through the pool
+# initializer, instead of with every task.
+
+PARAM_GRID = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [None, 8, 16, 24],
+    "max_features": ["sqrt", "log2", 0.5],
+    "min_samples_leaf": [1, 2, 4, 8],
+}
+
+
+def make_pipe(params: dict, random_state: int = 42, n_jobs=None, class_weight=None) -> Pipeline:
+    return Pipeline([
+        ("imputer", SimpleImputer(strategy="mean")),
+        ("rf", RandomForestClassifier(random_state=random_state, n_jobs=n_jobs, class_weight=class_weight, **params)),
+    ])
+
+
+def sample_configs(n_configs: int, seed: int = 42) -> list:
+    grid = [dict(zip(PARAM_GRID, values)) for values in product(*PARAM_GRID.values())]
+    # The current default (100 trees, unbounded depth, sqrt, leaf 1) is always a candidate
+    default = {"n_estimators": 100, "max_depth": None, "max_features": "sqrt", "min_samples_leaf": 1}
+    rest = [c for c in grid if c != default]
+    random.Random(seed).shuffle(rest)
+    return [default] + rest[:max(n_configs - 1, 0)]
+
+
+# Per worker process: (X, y, splits), set by _init_worker
+_DATA = None
+
+
+def _init_worker(X, y, splits):
+    global _DATA
+    _DATA = (X, y, splits)
+
+
+def _fit_fold(config_id: int, params: dict, fold: int, class_weight=None) -> dict:
+    """Runs in a worker process: fit one config on one fold and time it."""
+    X, y, splits = _DATA
+    train_idx, val_idx = splits[fold]
+    pipe = make_pipe(params, class_weight=class_weight)
+    t0 = time.perf_counter()
+    pipe.fit(X[train_idx], y[train_idx])
+    fit_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pred = pipe.predict(X[val_idx])
+    predict_s = time.perf_counter() - t0
+
+    # Latency the apps actually pay: one row through the compiled engine
+    compiled = CompiledForest(export_forest(pipe))
+    row = X[val_idx[:1]]
+    lat = []
+    for _ in range(20):
+        t = time.perf_counter()
+        compiled.predict_proba(row)
+        lat.append(time.perf_counter() - t)
+
+    return {
+        "config_id": config_id,
+        "fold": fold,
+        "accuracy": float(np.mean(pred == y[val_idx])),
+        "fit_s": fit_s,
+        "predict_ms_per_row": predict_s * 1000 / len(val_idx),
+        "single_row_ms": float(np.median(lat)) * 1000,
+        "n_nodes": int(len(compiled.feature)),
+    }
+
+
+def run_search(X, y, n_configs: int = 24, folds: int = 5, budget_s: float = 600.0,
+               workers: int = None, keep_fraction: float = 0.34, seed: int = 42, class_weight=None,
+               log=print) -> dict:
+    """
+    Returns {"best_params", "table", "folds", "budget_s", "elapsed_s", "workers"}.
+    `table` has one row per config with mean/std CV accuracy, timings and status
+    ("complete", "pruned" or "budget").
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y)
+    workers = workers or os.cpu_count() or 1
+    configs = sample_configs(n_configs, seed)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    results = {i: [] for i in range(len(configs))}
+    pruned = set()
+
+    t_start = time.perf_counter()
+    deadline = t_start + budget_s
+
+    def collect(pool, tasks):
+        """Submit tasks as [(config_id, fold)] and gather until done or out of time."""
+        futures = {pool.submit(_fit_fold, cid, configs[cid], f, class_weight) for cid, f in tasks}
+        while futures:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                running = {fut for fut in futures if not fut.cancel()}
+                log(f"Budget of {budget_s:.0f}s reached; {len(futures) - len(running)} fits cancelled, "
+                    f"waiting for {len(running)} already running")
+                for fut in wait(running).done:
+                    r = fut.result()
+                    results[r["config_id"]].append(r)
+                return False
+            done, futures = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                r = fut.result()
+                results[r["config_id"]].append(r)
+        return True
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, splits))
+    try:
+        # Round 1: every config on the first fold
+        in_time = collect(pool, [(cid, 0) for cid in range(len(configs))])
+
+        # Early stopping: keep only the best part of round 1
+        scored = sorted((r[0]["accuracy"], cid) for cid, r in results.items() if r)
+        n_keep = max(1, int(np.ceil(len(scored) * keep_fraction)))
+        survivors = [cid for _, cid in scored[-n_keep:]]
+        pruned = {cid for _, cid in scored[:-n_keep]}
+        log(f"Round 1: {len(scored)} configs scored, {len(survivors)} kept, {len(pruned)} pruned")
+
+        # Round 2: remaining folds for the survivors
+        if in_time and folds > 1:
+            collect(pool, [(cid, f) for cid in survivors for f in range(1, folds)])
+    finally:
+        # No fit outlives the search, so elapsed_s below is its full cost
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    table = []
+    for cid, params in enumerate(configs):
+        rs = results[cid]
+        if not rs:
+            continue
+        acc = [r["accuracy"] for r in rs]
+        status = "complete" if len(rs) == folds else ("pruned" if cid in pruned else "budget")
+        table.append({
+            **{k: params[k] for k in PARAM_GRID},
+            "folds_done": len(rs),
+            "cv_accuracy": float(np.mean(acc)),
+            "cv_std": float(np.std(acc)),
+            "fit_s": float(np.mean([r["fit_s"] for r in rs])),
+            "predict_ms_per_row": float(np.mean([r["predict_ms_per_row"] for r in rs])),
+            "single_row_ms": float(np.median([r["single_row_ms"] for r in rs])),
+            "n_nodes": int(np.mean([r["n_nodes"] for r in rs])),
+            "status": status,
+        })
+    if not table:
+        raise RuntimeError("No fits finished inside the time budget; raise --budget")
+
+    # Winner: best CV accuracy among fully evaluated configs, faster one on ties
+    complete = [row for row in table if row["status"] == "complete"] or table
+    best = max(complete, key=lambda row: (round(row["cv_accuracy"], 4), -row["single_row_ms"]))
+    table.sort(key=lambda row: (row["status"] != "complete", -row["cv_accuracy"]))
+
+    return {
+        "best_params": {k: best[k] for k in PARAM_GRID},
+        "table": table,
+        "folds": folds,
+        "budget_s": budget_s,
+        "elapsed_s": time.perf_counter() - t_start,
+        "workers": workers,
+    }
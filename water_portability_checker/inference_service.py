@@ -0,0 +1,292 @@
+"""
+Headless potability prediction service (stdlib HTTP server, no extra dependencies).
+
+    python inference_service.py --port 8600 --max-batch 256 --max-wait-ms 5
+
+POST /predict   one JSON object, a JSON list of objects, {"rows": [...]},
+                or NDJSON (one object per line). Keys may be UI names
+                ("Organic Carbon") or feature names ("organic_carbon").
+                Each result carries prediction, potable_prob and checks_passed.
+GET  /metrics   request/row counts, p50/p99 latency, batch-size histogram
+GET  /drift     per-feature input drift (PSI, mean shift) against the training reference
+GET  /healthz   model version and engine
+
+Concurrent requests are coalesced by a MicroBatcher into one vectorized
+model call per batch (bounded by --max-batch rows and --max-wait-ms).
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from batch_scoring import predict_with_proba
+from bundle_io import resolve_model_path
+from drift_monitor import DriftMonitor
+from feature_schema import row_to_vector
+from forest_engine import compiled_from_bundle
+from model_registry import get_bundle
+from rules import get_rules
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = resolve_model_path(BASE_DIR)
+
+# Upper edges of the batch-size histogram buckets (rows per model call)
+BATCH_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096]
+
+
+class ServiceMetrics:
+    """Rolling latency window plus cumulative counters."""
+
+    def __init__(self, window: int = 10_000):
+        self._lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_hist = [0] * (len(BATCH_BUCKETS) + 1)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    def observe_request(self, ms: float, rows: int):
+        with self._lock:
+            self.latencies_ms.append(ms)
+            self.requests += 1
+            self.rows += rows
+
+    def observe_batch(self, size: int):
+        i = next((i for i, edge in enumerate(BATCH_BUCKETS) if size <= edge), len(BATCH_BUCKETS))
+        with self._lock:
+            self.batch_hist[i] += 1
+            self.batches += 1
+
+    def observe_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lat = np.asarray(self.latencies_ms, dtype=float)
+            labels = [f"<={e}" for e in BATCH_BUCKETS] + [f">{BATCH_BUCKETS[-1]}"]
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "latency_ms": {
+                    "p50": float(np.percentile(lat, 50)) if len(lat) else None,
+                    "p99": float(np.percentile(lat, 99)) if len(lat) else None,
+                    "window": len(lat),
+                },
+                "batch_size_histogram": dict(zip(labels, self.batch_hist)),
+                "mean_batch_rows": self.rows / self.batches if self.batches else None,
+            }
+
+
+class MicroBatcher:
+    """
+    Collects row blocks from concurrent requests and scores them together.
+    The worker waits at most `max_wait` seconds after the first queued block,
+    or until `max_batch` rows are pending, then makes one model call.
+    """
+
+    def __init__(self, get_predictor, metrics: ServiceMetrics, max_batch: int = 256, max_wait: float = 0.005):
+        self.get_predictor = get_predictor
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, X: np.ndarray) -> Future:
+        fut = Future()
+        self._queue.put((X, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            rows = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                rows += len(item[0])
+            self._score(pending)
+
+    def _score(self, pending):
+        blocks = []
+        for x, fut in pending:
+            if len(x):
+                blocks.append((x, fut))
+            else:
+                # Nothing to score; kept out of the model call and the batch histogram
+                fut.set_result((np.empty(0, dtype=int), np.empty(0)))
+        if not blocks:
+            return
+        try:
+            X = np.vstack([x for x, _ in blocks])
+            pred, prob = predict_with_proba(self.get_predictor(), X)
+        except Exception as e:
+            if len(blocks) == 1:
+                blocks[0][1].set_exception(e)
+                return
+            # One bad block must not fail the whole batch: score each on its own
+            for block in blocks:
+                self._score([block])
+            return
+        self.metrics.observe_batch(len(X))
+        start = 0
+        for x, fut in blocks:
+            end = start + len(x)
+            fut.set_result((pred[start:end], prob[start:end]))
+            start = end
+
+
+def parse_rows(body: bytes, content_type: str):
+    """Returns (rows, is_ndjson)."""
+    text = body.decode("utf-8").strip()
+    if not text:
+        raise ValueError("Empty request body")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return [json.loads(line) for line in text.splitlines() if line.strip()], True
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        # Several JSON objects on separate lines without an NDJSON content type
+        return [json.loads(line) for line in text.splitlines() if line.strip()], True
+    if isinstance(payload, dict) and "rows" in payload:
+        payload = payload["rows"]
+    if isinstance(payload, dict):
+        return [payload], False
+    if isinstance(payload, list):
+        return payload, False
+    raise ValueError("Expected a JSON object, a list of objects or NDJSON")
+
+
+def make_handler(batcher: MicroBatcher, metrics: ServiceMetrics, features, info, get_drift=lambda: None):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: str, content_type: str = "application/json"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, json.dumps(metrics.snapshot(), indent=2))
+            elif self.path == "/drift":
+                monitor = get_drift()
+                if monitor is None:
+                    self._send(404, json.dumps({"error": "bundle has no drift reference"}))
+                else:
+                    self._send(200, json.dumps({"rows": monitor.rows, "features": monitor.scores()}, indent=2))
+            elif self.path == "/healthz":
+                self._send(200, json.dumps(info()))
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, json.dumps({"error": "not found"}))
+                return
+            t0 = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                rows, ndjson = parse_rows(self.rfile.read(length), self.headers.get("Content-Type", ""))
+                X = np.array([row_to_vector(r, features) for r in rows], dtype=float).reshape(-1, len(features))
+                monitor = get_drift()
+                if monitor is not None:
+                    monitor.update(X)
+                pred, prob = batcher.submit(X).result()
+                _, passed = get_rules(features).evaluate(X)
+            except (ValueError, TypeError, AttributeError) as e:
+                metrics.observe_error()
+                self._send(400, json.dumps({"error": str(e)}))
+                return
+            except Exception as e:
+                metrics.observe_error()
+                self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}))
+                return
+
+            results = [
+                {"prediction": int(p), "potable_prob": float(q), "checks_passed": int(c)}
+                for p, q, c in zip(pred, prob, passed)
+            ]
+            if ndjson:
+                self._send(200, "".join(json.dumps(r) + "\n" for r in results), "application/x-ndjson")
+            else:
+                self._send(200, json.dumps({"predictions": results}))
+            metrics.observe_request((time.perf_counter() - t0) * 1000, len(results))
+            if monitor is not None:
+                try:
+                    monitor.export(model_version=info()["model_version"])
+                except OSError:
+                    pass  # the drift file is best effort; /drift always has the live numbers
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet; use /metrics instead
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local potability inference service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled")
+    parser.add_argument("--max-batch", type=int, default=256, help="max rows per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="max time to wait for a batch to fill")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"Model file not found: {args.model}. Please run `python train_model.py` first.")
+
+    def get_predictor():
+        # Registry hot-reloads the bundle; the compiled engine is cached per version
+        loaded = get_bundle(args.model)
+        if args.engine == "compiled":
+            return loaded.derived("compiled", compiled_from_bundle)
+        return loaded.bundle["model"]
+
+    def get_drift():
+        # Per bundle version: a reloaded model starts a fresh monitor against its own reference
+        return get_bundle(args.model).derived("drift", DriftMonitor.from_bundle)
+
+    def info():
+        return {"model_version": get_bundle(args.model).version, "engine": args.engine}
+
+    features = get_bundle(args.model).bundle["features"]
+    get_predictor()  # warm up before accepting traffic
+
+    metrics = ServiceMetrics()
+    batcher = MicroBatcher(get_predictor, metrics, args.max_batch, args.max_wait_ms / 1000)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher, metrics, features, info, get_drift))
+    print(f"Serving on http://{args.host}:{args.port} (engine={args.engine}, "
+          f"max_batch={args.max_batch}, max_wait={args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
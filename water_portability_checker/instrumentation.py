@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# ------------------------------
+# Per-stage latency spans for the prediction path
+# ------------------------------
+# with recorder.span("predict"): ...
+# The process-wide StageRecorder keeps a rolling window per stage (for p50/p90/p99
+# in the diagnostics sidebar) plus cumulative histogram buckets, and can dump
+# both as a Prometheus text file. When diagnostics are off the app uses
+# NULL_RECORDER, whose span() hands back one shared no-op context manager.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_PATH = os.environ.get("POTABILITY_METRICS_PATH", os.path.join(BASE_DIR, "potability_metrics.prom"))
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class StageStats:
+    def __init__(self, window: int = WINDOW):
+        self.recent = deque(maxlen=window)
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.recent.append(seconds)
+        self.bucket_counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self) -> dict:
+        if not self.recent:
+            return {q: None for q in QUANTILES}
+        values = np.quantile(np.fromiter(self.recent, dtype=float), QUANTILES)
+        return dict(zip(QUANTILES, values.tolist()))
+
+
+class _Span:
+    __slots__ = ("recorder", "stage", "t0")
+
+    def __init__(self, recorder, stage):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.observe(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class StageRecorder:
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages = {}  # stage -> StageStats, in first-seen order
+        self._last_export = 0.0
+
+    def span(self, stage: str):
+        return _Span(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats(self.window)
+            stats.observe(seconds)
+
+    def summary(self) -> list:
+        """[(stage, count, p50, p90, p99, mean)] in seconds, for display."""
+        with self._lock:
+            rows = []
+            for stage, s in self._stages.items():
+                q = s.quantiles()
+                rows.append((stage, s.count, q[0.5], q[0.9], q[0.99], s.total / s.count))
+            return rows
+
+    def prometheus_text(self, prefix: str = "potability_stage_seconds") -> str:
+        lines = [
+            f"# HELP {prefix} Wall time per stage of the potability prediction path.",
+            f"# TYPE {prefix} histogram",
+        ]
+        with self._lock:
+            stages = list(self._stages.items())
+            for stage, s in stages:
+                cumulative = 0
+                for le, n in zip(BUCKETS + ["+Inf"], s.bucket_counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_sum{{stage="{stage}"}} {s.total:.9f}')
+                lines.append(f'{prefix}_count{{stage="{stage}"}} {s.count}')
+
+            lines.append(f"# HELP {prefix}_recent Rolling-window quantiles (last {self.window} observations).")
+            lines.append(f"# TYPE {prefix}_recent summary")
+            for stage, s in stages:
+                for q, v in s.quantiles().items():
+                    if v is not None:
+                        lines.append(f'{prefix}_recent{{stage="{stage}",quantile="{q}"}} {v:.9f}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str = METRICS_PATH, min_interval: float = 5.0) -> bool:
+        """Write the Prometheus text file at most every `min_interval` seconds (atomic rename)."""
+        now = time.monotonic()
+        with self._lock:  # one writer per interval, however many threads call in
+            if now - self._last_export < min_interval:
+                return False
+            self._last_export = now
+        # Unique temp name in the target dir: concurrent writers never share a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".tmp-")
+        try:
+            os.fchmod(fd, 0o644)  # mkstemp's 0600 would hide the file from a metrics collector
+            with os.fdopen(fd, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return True
+
+
+class NullRecorder:
+    """Stand-in used when diagnostics are off: no timing, no locking."""
+
+    _span = nullcontext()
+
+    def span(self, stage: str):
+        return self._span
+
+    def observe(self, stage: str, seconds: float):
+        pass
+
+    def export(self, path: str = METRICS_PATH, min_interval: float = 5.0) -> bool:
+        return False
+
+
+NULL_RECORDER = NullRecorder()
+_recorder = StageRecorder()
+
+
+def get_recorder(enabled: bool = True):
+    return _recorder if enabled else NULL_RECORDER
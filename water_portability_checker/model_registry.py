@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+
+from bundle_io import load_any, stamp_path
+
+# ------------------------------
+# Process-wide model registry
+# ------------------------------
+# Streamlit re-executes the app script on every widget change, but imported
+# modules stay in sys.modules for the life of the server process.  Keeping the
+# loaded bundles here means every rerun and every session shares one copy.
+
+# How often (seconds) a rerun is allowed to stat() the bundle for changes
+CHECK_INTERVAL = 2.0
+
+# RSS is process-wide, so only one load is measured at a time
+_measure_lock = threading.Lock()
+
+
+def resident_bytes() -> int:
+    """Current resident set size of this process (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak RSS only (kB on Linux, bytes on macOS) - good enough for a delta
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+
+def file_digest(path: str) -> str:
+    """sha256 of the bundle file (or of an mmap bundle's meta.json), read in 1 MiB blocks."""
+    h = hashlib.sha256()
+    with open(stamp_path(path), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stamp(path: str):
+    st = os.stat(stamp_path(path))
+    return st.st_mtime_ns, st.st_size
+
+
+class LoadedBundle:
+    """A loaded model bundle plus what it cost to load it."""
+
+    def __init__(self, path, bundle, digest, stamp, load_seconds, memory_bytes):
+        self.path = path
+        self.bundle = bundle
+        self.digest = digest
+        self.stamp = stamp
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self._derived = {}
+
+    def derived(self, key, build):
+        """Build (once) and cache an object derived from this bundle, e.g. a compiled engine."""
+        if key not in self._derived:
+            self._derived[key] = build(self.bundle)
+        return self._derived[key]
+
+    @property
+    def version(self) -> str:
+        # Short content hash, handy for cache keys and captions
+        return self.digest[:12]
+
+
+def load_bundle(path: str) -> LoadedBundle:
+    """
+    Load a bundle (pickle file or mmap directory), measuring wall time and RSS growth.
+    For mmap bundles the RSS cost is only what has been paged in so far.
+    """
+    stamp = file_stamp(path)
+    digest = file_digest(path)
+
+    with _measure_lock:
+        before = resident_bytes()
+        t0 = time.perf_counter()
+        bundle = load_any(path)
+        load_seconds = time.perf_counter() - t0
+        after = resident_bytes()
+
+    return LoadedBundle(path, bundle, digest, stamp, load_seconds, max(after - before, 0))
+
+
+class ModelRegistry:
+    """
+    Loads each bundle path once and hands the same object to every caller.
+    When the file on disk changes (mtime/size, confirmed by content hash) a
+    background thread loads the new version; callers keep getting the old
+    one until the swap is complete.
+    """
+
+    def __init__(self, check_interval: float = CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}      # path -> LoadedBundle
+        self._last_check = {}   # path -> monotonic time of last stat()
+        self._reloading = set() # paths with a background reload in flight
+        self.reload_count = 0
+        self.last_error = None
+
+    def get(self, path: str) -> LoadedBundle:
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+
+        if entry is None:
+            # First request in this process: load synchronously
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is None:
+                    entry = load_bundle(path)
+                    self._entries[path] = entry
+                    self._last_check[path] = time.monotonic()
+            return entry
+
+        self._maybe_reload(path, entry)
+        return entry
+
+    def _maybe_reload(self, path: str, entry: LoadedBundle):
+        now = time.monotonic()
+        with self._lock:
+            if path in self._reloading or now - self._last_check.get(path, 0) < self.check_interval:
+                return
+            self._last_check[path] = now
+            try:
+                stamp = file_stamp(path)
+            except OSError:
+                # File is being replaced or was removed: keep serving the old model
+                return
+            if stamp == entry.stamp:
+                return
+            self._reloading.add(path)
+
+        threading.Thread(target=self._reload, args=(path, entry), daemon=True).start()
+
+    def _reload(self, path: str, old: LoadedBundle):
+        try:
+            if file_digest(path) == old.digest:
+                # Touched but not changed: just remember the new stamp
+                with self._lock:
+                    old.stamp = file_stamp(path)
+                return
+            new = load_bundle(path)
+            with self._lock:
+                self._entries[path] = new
+                self.reload_count += 1
+                self.last_error = None
+        except Exception as e:
+            # Half-written file or bad pickle: keep the old model, retry on next check
+            self.last_error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._reloading.discard(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                path: {
+                    "version": e.version,
+                    "load_seconds": e.load_seconds,
+                    "memory_bytes": e.memory_bytes,
+                    "loaded_at": e.loaded_at,
+                    "reloading": path in self._reloading,
+                }
+                for path, e in self._entries.items()
+            }
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+
+def get_bundle(path: str) -> LoadedBundle:
+    return _registry.get(path)
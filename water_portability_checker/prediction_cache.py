@@ -0,0 +1,100 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# ------------------------------
+# Bounded LRU + TTL cache for single-row predictions
+# ------------------------------
+# Keys are the feature vector quantized to the form's 6-decimal precision, so
+# resubmitting the same sample (or the form defaults) skips the forest entirely.
+# The cache is process-wide and tied to one model version: when the registry
+# hands out a different bundle, every entry is dropped.
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL = 3600.0  # seconds
+DECIMALS = 6
+
+
+def quantize(values, decimals: int = DECIMALS) -> tuple:
+    # NaN never equals itself, so map it to None to make missing values cacheable
+    return tuple(None if math.isnan(v) else round(float(v), decimals) for v in values)
+
+
+class PredictionCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, model_version):
+        if model_version != self.model_version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.model_version = model_version
+
+    def get(self, model_version, key):
+        """Cached value or None; counts a hit or a miss."""
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(model_version)
+            item = self._data.get(key)
+            if item is not None and item[0] < now:
+                del self._data[key]
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, model_version, key, value):
+        with self._lock:
+            self._check_version(model_version)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, model_version, key, compute):
+        value = self.get(model_version, key)
+        if value is None:
+            value = compute()
+            self.put(model_version, key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+_cache = PredictionCache()
+
+
+def get_cache() -> PredictionCache:
+    return _cache
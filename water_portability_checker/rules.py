@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# ------------------------------
+# Table-driven rule checks
+# ------------------------------
+# The thresholds live in potability_rules.json (override with the
+# POTABILITY_RULES environment variable). They are compiled once into lo/hi
+# arrays, and any number of rows is checked with one broadcasted comparison.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.environ.get("POTABILITY_RULES", os.path.join(BASE_DIR, "potability_rules.json"))
+
+
+class RuleSet:
+    """Compiled range rules over the training feature order."""
+
+    def __init__(self, rules: list, features: list):
+        missing = [r["feature"] for r in rules if r["feature"] not in features]
+        if missing:
+            raise ValueError(f"Rules reference unknown features: {', '.join(missing)}")
+        self.rules = rules
+        self.features = list(features)
+        self.names = [r["name"] for r in rules]
+        self.columns = np.array([self.features.index(r["feature"]) for r in rules], dtype=np.intp)
+        self.lo = np.array([r["lo"] for r in rules], dtype=float)
+        self.hi = np.array([r["hi"] for r in rules], dtype=float)
+
+    @property
+    def thresholds(self) -> dict:
+        """{rule name: (lo, hi)} with the values as written in the config, for display."""
+        return {r["name"]: (r["lo"], r["hi"]) for r in self.rules}
+
+    def evaluate(self, X):
+        """
+        X: (rows, features) in training feature order.
+        Returns (ok, passed): ok is a (rows, rules) bool matrix, passed the per-row count.
+        NaN values fail their rule.
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        V = X[:, self.columns]
+        ok = (V >= self.lo) & (V <= self.hi)
+        return ok, ok.sum(axis=1)
+
+    def check_row(self, values) -> dict:
+        """Single feature vector -> {rule name: bool}, in rule order."""
+        ok, _ = self.evaluate(values)
+        return dict(zip(self.names, ok[0].tolist()))
+
+    def describe(self, values):
+        """Single feature vector -> [(name, value, lo, hi, ok)] for display."""
+        values = np.asarray(values, dtype=float).ravel()
+        ok, _ = self.evaluate(values)
+        return [
+            (r["name"], float(values[c]), r["lo"], r["hi"], bool(o))
+            for r, c, o in zip(self.rules, self.columns, ok[0])
+        ]
+
+
+def load_rules(features: list, path: str = RULES_PATH) -> RuleSet:
+    with open(path) as f:
+        config = json.load(f)
+    return RuleSet(config["rules"], features)
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_rules(features: list, path: str = RULES_PATH) -> RuleSet:
+    """
+    Compiled rules, re-read only when the config file changes on disk,
+    so thresholds can be edited without a code change or restart.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    key = (path, tuple(features))
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, load_rules(features, path))
+            _cache[key] = cached
+        return cached[1]
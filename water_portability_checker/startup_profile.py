@@ -0,0 +1,169 @@
+"""
+Import-time profile of the Streamlit apps, to keep cold starts from regressing.
+
+    python startup_profile.py                       # writes startup_profile.json
+    python startup_profile.py --baseline old.json   # exit code 1 on regressions
+
+For every app two numbers are measured in fresh interpreters:
+  shell   - the module-level imports that run before the page shell is drawn
+            (everything above the get_warmup() call; the whole file if there is none),
+            broken down by top-level package with `python -X importtime`
+  warm-up - the background warm-up: heavy imports plus the model bundle load
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BASE_DIR)
+RESULTS_PATH = os.path.join(BASE_DIR, "startup_profile.json")
+
+APPS = [
+    os.path.join(BASE_DIR, "water_portability_checker.py"),
+    os.path.join(BASE_DIR, "water_potability_checker_2.py"),
+    os.path.join(REPO_DIR, "main.py"),
+]
+
+WARMUP_SNIPPET = """
+import json, sys
+from warmup import get_warmup
+w = get_warmup()
+w.start({base_dir!r})
+w.wait()
+print(json.dumps({{"steps": w.steps, "error": w.error}}))
+"""
+
+
+def shell_imports(app_path: str) -> str:
+    """Source of the module-level imports that run before the warm-up gate."""
+    tree = ast.parse(open(app_path, encoding="utf-8").read())
+    gate = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "get_warmup":
+            gate = node.lineno
+            break
+    lines = [
+        ast.unparse(node) for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and (gate is None or node.lineno < gate)
+    ]
+    return "\n".join(lines)
+
+
+def parse_importtime(stderr: str):
+    """(total self time, {top-level package: cumulative}) in ms from -X importtime output."""
+    total, top = 0.0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us) / 1000
+        if not name[1:].startswith(" "):  # not nested under another import
+            package = name.strip().split(".")[0]
+            top[package] = top.get(package, 0.0) + int(cumulative_us) / 1000
+    return total, top
+
+
+def profile_shell(app_path: str) -> dict:
+    code = shell_imports(app_path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(app_path), capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(app_path)}: shell imports failed\n{result.stderr[-2000:]}")
+    total, top = parse_importtime(result.stderr)
+    return {"imports": code.splitlines(), "ms": total, "top": top}
+
+
+def profile_warmup(app_path: str):
+    source = open(app_path, encoding="utf-8").read()
+    if "get_warmup" not in source:
+        return None
+    app_dir = os.path.dirname(app_path)
+    result = subprocess.run(
+        [sys.executable, "-c", WARMUP_SNIPPET.format(base_dir=app_dir)],
+        cwd=app_dir, capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(app_path)}: warm-up failed\n{result.stderr[-2000:]}")
+    out = json.loads(result.stdout.strip().splitlines()[-1])
+    steps = {name: seconds * 1000 for name, seconds in out["steps"]}
+    return {"ms": sum(steps.values()), "steps": steps, "error": out["error"]}
+
+
+def run(apps, runs: int) -> dict:
+    results = {}
+    for app in apps:
+        name = os.path.relpath(app, REPO_DIR)
+        shells = [profile_shell(app) for _ in range(runs)]
+        warmups = [profile_warmup(app) for _ in range(runs)]
+        # Medians over fresh interpreters; the breakdown comes from the median run
+        shell = sorted(shells, key=lambda r: r["ms"])[len(shells) // 2]
+        entry = {
+            "shell_imports": shell["imports"],
+            "shell_import_ms": statistics.median(r["ms"] for r in shells),
+            "shell_top": dict(sorted(shell["top"].items(), key=lambda kv: -kv[1])[:8]),
+        }
+        if warmups[0] is not None:
+            warm = sorted(warmups, key=lambda r: r["ms"])[len(warmups) // 2]
+            entry.update({
+                "warmup_ms": statistics.median(r["ms"] for r in warmups),
+                "warmup_steps": dict(sorted(warm["steps"].items(), key=lambda kv: -kv[1])[:8]),
+                "warmup_error": warm["error"],
+            })
+        results[name] = entry
+
+        print(f"\n{name}")
+        print(f"  shell (before first paint) {entry['shell_import_ms']:8.1f} ms")
+        for package, ms in entry["shell_top"].items():
+            print(f"    {package:<28} {ms:8.1f} ms")
+        if "warmup_ms" in entry:
+            print(f"  background warm-up         {entry['warmup_ms']:8.1f} ms")
+            for step, ms in entry["warmup_steps"].items():
+                print(f"    {step:<28} {ms:8.1f} ms")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions as (app, metric, baseline ms, current ms)."""
+    regressions = []
+    for app, cur in results.items():
+        base = baseline.get("results", {}).get(app, {})
+        for metric in ("shell_import_ms", "warmup_ms"):
+            if metric in cur and base.get(metric) and cur[metric] > base[metric] * (1 + tolerance):
+                regressions.append((app, metric, base[metric], cur[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the Streamlit apps")
+    parser.add_argument("apps", nargs="*", default=APPS, help="app scripts (default: all three)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON report")
+    parser.add_argument("--baseline", help="compare against this report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "runs": args.runs,
+              "results": run([os.path.abspath(a) for a in args.apps], args.runs)}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline, args.tolerance)
+        for app, metric, base, cur in regressions:
+            print(f"REGRESSION {app} {metric}: {base:.1f} -> {cur:.1f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
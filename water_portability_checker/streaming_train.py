@@ -0,0 +1,158 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+
+from data_cache import TARGET
+from data_prep import class_weight_from_counts
+
+# ------------------------------
+# Out-of-core training from a chunked CSV
+# ------------------------------
+# Pass 1 streams the file once for column means, row count and class counts.
+# Pass 2 imputes each chunk with the global means and grows the forest with
+# warm_start: every chunk adds its own batch of trees. Class balance comes from
+# class_weight (computed from the global counts) instead of duplicating rows.
+# Pass 3 scores the held-out rows chunk by chunk. A chunk holding only one
+# class is carried into the next one, up to MAX_CARRY_CHUNKS chunks; past that
+# (a file sorted by label) training stops with an error instead of reading the
+# whole file into memory. Peak memory follows --chunksize, not the file size.
+
+HOLDOUT_EVERY = 5  # every 5th row (by position in the file) is held out -> 80/20 split
+MAX_CARRY_CHUNKS = 4
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def read_chunks(csv_path: str, chunksize: int):
+    """Yields (chunk, global row positions)."""
+    start = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        positions = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk, positions
+
+
+def scan_statistics(csv_path: str, chunksize: int) -> dict:
+    """One pass: NaN-aware column means over all rows, row count, class counts of the training part."""
+    sums = counts = None
+    columns = None
+    n_rows = 0
+    class_counts = {}
+    for chunk, pos in read_chunks(csv_path, chunksize):
+        X = chunk.drop(columns=TARGET)
+        if columns is None:
+            columns = list(X.columns)
+            sums = np.zeros(len(columns))
+            counts = np.zeros(len(columns))
+        values = X.to_numpy(dtype=float)
+        sums += np.nansum(values, axis=0)
+        counts += np.sum(~np.isnan(values), axis=0)
+        n_rows += len(chunk)
+        train = pos % HOLDOUT_EVERY != 0
+        for cls, n in chunk.loc[train, TARGET].value_counts().items():
+            class_counts[int(cls)] = class_counts.get(int(cls), 0) + int(n)
+    return {
+        "columns": columns,
+        "means": sums / np.maximum(counts, 1),
+        "n_rows": n_rows,
+        "class_counts": class_counts,
+    }
+
+
+def holdout_accuracy(model, csv_path: str, chunksize: int, columns=None, return_rows: bool = False):
+    """Accuracy on the held-out rows (every HOLDOUT_EVERY-th), scored chunk by chunk."""
+    correct = total = 0
+    for chunk, pos in read_chunks(csv_path, chunksize):
+        test = chunk[pos % HOLDOUT_EVERY == 0]
+        if len(test):
+            X = test.drop(columns=TARGET) if columns is None else test[columns]
+            pred = model.predict(X.to_numpy(dtype=float))
+            correct += int(np.sum(pred == test[TARGET].to_numpy()))
+            total += len(test)
+    acc = correct / total if total else float("nan")
+    return (acc, total) if return_rows else acc
+
+
+def train_streaming(csv_path: str, chunksize: int = 100_000, n_estimators: int = 100,
+                    random_state: int = 42, log=print):
+    """
+    Returns (pipe, holdout_accuracy, info). `pipe` is the usual Pipeline(imputer, rf), so the
+    bundle, compiled engine and apps work unchanged.
+    """
+    t0 = time.perf_counter()
+    stats = scan_statistics(csv_path, chunksize)
+    n_chunks = max(1, -(-stats["n_rows"] // chunksize))
+    trees_per_chunk = max(1, -(-n_estimators // n_chunks))
+    log(f"Pass 1: {stats['n_rows']:,} rows in {n_chunks} chunks, "
+        f"class counts {stats['class_counts']}, {trees_per_chunk} trees per chunk")
+
+    means = stats["means"]
+    rf = RandomForestClassifier(
+        n_estimators=0, warm_start=True, random_state=random_state,
+        class_weight=class_weight_from_counts(stats["class_counts"]),  # global counts, not per chunk
+    )
+
+    carry = None  # a chunk holding only one class is merged into the next one
+    for i, (chunk, pos) in enumerate(read_chunks(csv_path, chunksize)):
+        if rf.n_estimators >= n_estimators:
+            # More chunks than trees: each tree sees a single chunk, so the tail goes unused
+            log(f"All {n_estimators} trees grown; rows from {int(pos[0]):,} on are not trained on "
+                f"(raise --chunksize to use them)")
+            break
+        train = chunk[pos % HOLDOUT_EVERY != 0]
+        if carry is not None:
+            train = pd.concat([carry, train])
+            carry = None
+        if train[TARGET].nunique() < len(stats["class_counts"]):
+            if len(train) > MAX_CARRY_CHUNKS * chunksize:
+                raise ValueError(
+                    f"More than {MAX_CARRY_CHUNKS * chunksize:,} consecutive training rows hold only one "
+                    f"class (is the file sorted by {TARGET}?); shuffle the rows or raise --chunksize"
+                )
+            carry = train
+            continue
+        X = train[stats["columns"]].to_numpy(dtype=float)
+        X = np.where(np.isnan(X), means, X)
+        # The trees still owed, spread over the chunks still to come: never more than
+        # n_estimators in total, and chunks skipped as carry are made up later
+        rf.n_estimators += -(-(n_estimators - rf.n_estimators) // (n_chunks - i))
+        rf.fit(X, train[TARGET].to_numpy())
+    if carry is not None:
+        if not rf.n_estimators:
+            raise ValueError("Training data must contain every class")
+        # Leftover single-class tail: already represented by the earlier trees
+        log(f"Skipped {len(carry):,} trailing rows that contain only one class")
+    log(f"Pass 2: {rf.n_estimators} trees grown")
+
+    # Imputer fitted on one row of the global means -> statistics_ == means
+    imputer = SimpleImputer(strategy="mean").fit(means.reshape(1, -1))
+    pipe = Pipeline([("imputer", imputer), ("rf", rf)])
+
+    acc, total = holdout_accuracy(pipe, csv_path, chunksize, stats["columns"], return_rows=True)
+
+    info = {
+        "mode": "stream",
+        "chunksize": chunksize,
+        "n_rows": stats["n_rows"],
+        "n_chunks": n_chunks,
+        "trees_per_chunk": trees_per_chunk,
+        "class_counts": stats["class_counts"],
+        "holdout_rows": total,
+        "seconds": time.perf_counter() - t0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    log(f"Pass 3: holdout accuracy {acc * 100:.2f}% on {total:,} rows; "
+        f"{info['seconds']:.1f}s, peak RSS {info['peak_rss_mb']:.0f} MiB")
+    return pipe, acc, info
@@ -1,53 +1,36 @@
-import pandas as pd
-from sklearn.utils import resample
+import numpy as np
 from sklearn.model_selection import train_test_split
 
-CSV_PATH = "water_potability.csv"
-
-# Load and clean
-df_water = pd.read_csv(CSV_PATH)
-df_clean = df_water.fillna(df_water.mean())
-
-X = df_clean.iloc[:, :-1]
-y = df_clean['Potability']
-
-# Combine features and target to handle together
-df = pd.concat([X, y], axis=1)
-
-# Separate majority and minority classes
-class_counts = df['Potability'].value_counts()
-print(f"Before: {class_counts}")
-maj_class = class_counts.idxmax()
-min_class = class_counts.idxmin()
+from data_prep import balanced_arrays, balanced_class_weight, compare_peak_memory, load_clean
 
-df_majority = df[df['Potability'] == maj_class]
-df_minority = df[df['Potability'] == min_class]
+CSV_PATH = "water_potability.csv"
 
-# Upsample minority to match majority count
-df_minority_upsampled = resample(
-    df_minority,
-    replace=True,                  # Sample with replacement
-    n_samples=len(df_majority),    # Match majority count
-    random_state=42
-)
 
-# Combine majority and upsampled minority
-df_balanced = pd.concat([df_majority, df_minority_upsampled])
+def counts(y):
+    classes, n = np.unique(y, return_counts=True)
+    return {int(c): int(k) for c, k in zip(classes, n)}
 
-# Shuffle the balanced dataset
-df_balanced = df_balanced.sample(frac=1, random_state=42).reset_index(drop=True)
 
-print(f"After: {df_balanced['Potability'].value_counts()}")
+# Load and clean (mean imputation, in place)
+X, y, _ = load_clean(CSV_PATH)
+print(f"Before: {counts(y)}")
 
-# Now split into X and y
-X_bal = df_balanced.iloc[:, :-1]
-y_bal = df_balanced['Potability']
+# Upsample minority to match majority count: index gather, rows copied once
+X_bal, y_bal = balanced_arrays(X, y)
+print(f"After: {counts(y_bal)}")
 
 # Train/test split
 x_train, x_test, y_train, y_test = train_test_split(
     X_bal, y_bal, train_size=0.8, random_state=42, stratify=y_bal
 )
 
-print("Balanced class counts:", y_bal.value_counts().to_dict())
-print("Train class counts:", y_train.value_counts().to_dict())
-print("Test class counts:", y_test.value_counts().to_dict())
+print("Balanced class counts:", counts(y_bal))
+print("Train class counts:", counts(y_train))
+print("Test class counts:", counts(y_test))
+
+# Zero-copy alternative: keep the rows, weight the classes instead
+print("class_weight alternative:", {c: round(w, 4) for c, w in balanced_class_weight(y).items()})
+
+# Peak memory of the old DataFrame sequence vs. the shared data-prep paths
+for name, peak in compare_peak_memory(CSV_PATH).items():
+    print(f"Peak memory {name}: {peak / 2**20:.2f} MiB")
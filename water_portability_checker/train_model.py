@@ -1,90 +1,229 @@
+import argparse
+
 import pandas as pd
 
-from sklearn.utils import resample
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score
 import joblib
-from typing import List, Dict
+import numpy as np
+from typing import Dict
+
+from attributions import export_attributions
+from bundle_io import MMAP_DIR_NAME, save_mmap_bundle
+from data_cache import TARGET, load_dataset
+from data_prep import balanced_arrays, balanced_class_weight, load_clean
+from drift_monitor import reference_profile
+from forest_engine import CompiledForest, export_forest
+from forest_optimize import describe_optimizations, early_exit_order, measure_variant, optimize
+from hyperparam_search import make_pipe, run_search
+from streaming_train import holdout_accuracy, read_chunks, train_streaming
 
 # --- Expected feature order (lowercase) ---
-FEATURES: List[str] = [
-    "ph",
-    "hardness",
-    "solids",
-    "chloramines",
-    "sulfate",
-    "conductivity",
-    "organic_carbon",
-    "trihalomethanes",
-    "turbidity",
-]
+from feature_schema import FEATURES
 
 CSV_PATH = "water_potability.csv"
 MODEL_PATH = "water_potability_rf.pkl"
 
-df_water = pd.read_csv(CSV_PATH)
-
-df_clean = df_water.fillna(df_water.mean())
-
-# x are features
-x = df_clean[list(df_clean.columns)[0: -1]]
-
-# y = output
-y = df_clean['Potability']
-
-## Data Balancing 
-
-# Combine features and target to handle together
-df_upsampling = pd.concat([x, y], axis=1)
-
-# Separate majority and minority classes
-class_counts = df_upsampling['Potability'].value_counts()
-
-maj_class = class_counts.idxmax()
-min_class = class_counts.idxmin()
-
-df_majority = df_upsampling[df_upsampling['Potability'] == maj_class]
-df_minority = df_upsampling[df_upsampling['Potability'] == min_class]
-
-# Upsample minority to match majority count
-df_minority_upsampled = resample(
-    df_minority,
-    replace=True,                  # Sample with replacement
-    n_samples=len(df_majority),    # Match majority count
-    random_state=42
-)
-
-# Combine majority and upsampled minority
-df_balanced = pd.concat([df_majority, df_minority_upsampled])
-
-# Shuffle the balanced dataset
-df_balanced = df_balanced.sample(frac=1, random_state=42).reset_index(drop=True)
-
-X_bal = df_balanced.iloc[:, :-1]
-y_bal = df_balanced['Potability']
-
-# Data Splitting
-x_train, x_test, y_train, y_test = train_test_split(X_bal, y_bal, train_size = 0.8, random_state = 42)
-
-pipe = Pipeline([
-    ("imputer", SimpleImputer(strategy="mean")),
-    ("rf", RandomForestClassifier(random_state=42))
-])
-
-
-pipe.fit(x_train, y_train)
-y_pred = pipe.predict(x_test)
-acc = accuracy_score(y_test, y_pred)
-print(f"Test Accuracy: {acc * 100:.2f}%")
-
-# Save model + metadata (feature order) for safe reuse
-bundle: Dict = {
-    "model": pipe,
-    "features": FEATURES,
-    "test_accuracy": acc,
-}
-joblib.dump(bundle, MODEL_PATH)
-print(f"Saved: {MODEL_PATH}")
\ No newline at end of file
+# Variants shown by --optimize-report when no optimization flag is given
+REPORT_DEFAULTS = {"max_depth": 12, "keep_trees": 0.5, "float32": True}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the water potability RandomForest")
+    parser.add_argument(
+        "--format", choices=["pickle", "mmap", "both"], default="pickle",
+        help="pickle: joblib .pkl; mmap: shareable directory of .npy arrays + meta.json",
+    )
+    parser.add_argument("--search", action="store_true",
+                        help="cross-validated hyperparameter search before the final fit")
+    parser.add_argument("--n-configs", type=int, default=24, help="configs sampled from the search grid")
+    parser.add_argument("--folds", type=int, default=5, help="k for k-fold cross-validation")
+    parser.add_argument("--budget", type=float, default=600.0, help="search wall-clock budget in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--stream", action="store_true",
+                        help="out-of-core training: read the CSV in chunks, grow the forest per chunk")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows per chunk in --stream mode")
+    parser.add_argument("--csv", default=CSV_PATH, help="training data")
+    parser.add_argument("--balance", choices=["upsample", "class_weight"], default="upsample",
+                        help="upsample: duplicate minority rows; class_weight: reweight classes, no copies")
+    # Post-training optimizations of the saved forest (applied to the compiled arrays)
+    parser.add_argument("--max-depth-cap", type=int, default=None,
+                        help="turn nodes at this depth into leaves")
+    parser.add_argument("--keep-trees", type=float, default=None,
+                        help="keep the N best trees by out-of-bag accuracy (a value below 1 is a fraction)")
+    parser.add_argument("--float32", action="store_true", help="store thresholds and leaf values as float32")
+    parser.add_argument("--optimize-report", action="store_true",
+                        help="print size / load time / latency / accuracy for each optimization variant")
+    args = parser.parse_args()
+    if args.stream and args.keep_trees is not None:
+        parser.error("--keep-trees needs in-memory training (per-tree out-of-bag rows)")
+    return args
+
+
+def has_optimizations(args) -> bool:
+    return args.max_depth_cap is not None or args.keep_trees is not None or args.float32
+
+
+def apply_optimizations(bundle: Dict, args, x_train=None, y_train=None, x_test=None, y_test=None) -> Dict:
+    """
+    Replace the bundle's forest with the optimized compiled arrays. The sklearn
+    pipeline no longer matches them, so the compiled engine becomes the model.
+    """
+    rf = bundle["model"].named_steps["rf"]
+    samples = rf.estimators_samples_ if x_train is not None else None
+    fit_rows = {"X": x_train, "y": y_train, "samples": samples}
+    requested = {"max_depth": args.max_depth_cap, "keep_trees": args.keep_trees, "float32": args.float32}
+
+    if args.optimize_report and x_test is not None:
+        # Each option on its own, then all of them together
+        variants = {"baseline": bundle}
+        report_options = requested if has_optimizations(args) else REPORT_DEFAULTS
+        if samples is None:
+            report_options = dict(report_options, keep_trees=None)
+        singles = [{k: v} for k, v in report_options.items() if v not in (None, False)]
+        for options in singles + ([report_options] if len(singles) > 1 else []):
+            arrays, opts = optimize(bundle["compiled"], **options, **fit_rows)
+            variants[describe_optimizations(opts) or "unchanged"] = optimized_bundle(bundle, arrays, opts)
+        rows = [{"variant": name, **measure_variant(b, x_test, y_test)} for name, b in variants.items()]
+        print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    arrays, opts = optimize(bundle["compiled"], **requested, **fit_rows)
+    print(f"Optimizations: {describe_optimizations(opts) or 'none applied'}")
+    return optimized_bundle(bundle, arrays, opts)
+
+
+def add_inference_extras(bundle: Dict, X) -> Dict:
+    """
+    Store the early-exit tree order and the per-leaf TreeSHAP tables in the
+    compiled arrays. Runs last: optimizations renumber trees and change node values.
+    """
+    compiled = dict(bundle["compiled"], tree_order=early_exit_order(bundle["compiled"], X))
+    compiled.update(export_attributions(compiled))
+    out = dict(bundle, compiled=compiled)
+    if isinstance(out["model"], CompiledForest):
+        out["model"] = CompiledForest(compiled)
+    return out
+
+
+def optimized_bundle(bundle: Dict, arrays: Dict, optimizations: Dict) -> Dict:
+    if not optimizations:
+        return bundle
+    return dict(bundle, compiled=arrays, model=CompiledForest(arrays), optimizations=optimizations)
+
+
+def load_balanced(csv_path: str = CSV_PATH, balance: str = "upsample"):
+    """
+    Returns (X, y, class_weight). "upsample" duplicates minority rows via one index
+    gather; "class_weight" keeps the rows as they are and reweights the classes.
+    """
+    X, y, _ = load_clean(csv_path)
+    if balance == "class_weight":
+        return X, y, balanced_class_weight(y)
+    X_bal, y_bal = balanced_arrays(X, y)
+    return X_bal, y_bal, None
+
+
+def save_bundle(bundle: Dict, fmt: str):
+    if fmt in ("pickle", "both"):
+        joblib.dump(bundle, MODEL_PATH)
+        print(f"Saved: {MODEL_PATH}")
+
+    # Uncompressed, memory-mappable copy: processes share one physical copy of the arrays
+    if fmt in ("mmap", "both"):
+        meta = {k: v for k, v in bundle.items() if k not in ("model", "compiled")}
+        save_mmap_bundle(MMAP_DIR_NAME, bundle["compiled"], meta)
+        print(f"Saved: {MMAP_DIR_NAME}/")
+
+
+def main_streaming(args):
+    # Never holds more than one chunk: no fillna/concat/resample copies of the full file
+    pipe, acc, info = train_streaming(args.csv, chunksize=args.chunksize)
+    print(f"Test Accuracy: {acc * 100:.2f}%")
+
+    compiled = export_forest(pipe)
+    sample, _ = next(read_chunks(args.csv, min(args.chunksize, 10_000)))
+    sample = sample.drop(columns="Potability").to_numpy(dtype=float)
+    same = np.array_equal(CompiledForest(compiled).predict_proba(sample), pipe.predict_proba(sample))
+    print(f"Compiled engine matches sklearn: {same}")
+
+    bundle = {
+        "model": pipe,
+        "compiled": compiled,
+        "features": FEATURES,
+        "test_accuracy": acc,
+        "training": info,
+        # Drift reference from the first chunk only: the file is never held in memory
+        "reference": reference_profile(sample, FEATURES),
+    }
+    if has_optimizations(args):
+        bundle = apply_optimizations(bundle, args)
+        bundle["test_accuracy"] = holdout_accuracy(bundle["model"], args.csv, args.chunksize)
+        print(f"Optimized Test Accuracy: {bundle['test_accuracy'] * 100:.2f}%")
+    save_bundle(add_inference_extras(bundle, sample), args.format)
+
+
+def main():
+    args = parse_args()
+    if args.stream:
+        main_streaming(args)
+        return
+
+    X_bal, y_bal, class_weight = load_balanced(args.csv, args.balance)
+
+    # Data Splitting
+    x_train, x_test, y_train, y_test = train_test_split(X_bal, y_bal, train_size = 0.8, random_state = 42)
+
+    search = None
+    if args.search:
+        # CV runs on the training split only; the test split stays untouched for the final score
+        search = run_search(x_train, y_train, n_configs=args.n_configs, folds=args.folds,
+                            budget_s=args.budget, workers=args.workers, class_weight=class_weight)
+        print(f"Search: {len(search['table'])} configs in {search['elapsed_s']:.1f}s "
+              f"on {search['workers']} workers")
+        print(pd.DataFrame(search["table"]).head(10).to_string(index=False))
+        print(f"Best params: {search['best_params']}")
+        pipe = make_pipe(search["best_params"], n_jobs=-1, class_weight=class_weight)
+    else:
+        pipe = Pipeline([
+            ("imputer", SimpleImputer(strategy="mean")),
+            ("rf", RandomForestClassifier(random_state=42, class_weight=class_weight))
+        ])
+
+    pipe.fit(x_train, y_train)
+    # Train on all cores, but keep single-row predictions in the apps free of thread fan-out
+    pipe.named_steps["rf"].set_params(n_jobs=None)
+    y_pred = pipe.predict(x_test)
+    acc = accuracy_score(y_test, y_pred)
+    print(f"Test Accuracy: {acc * 100:.2f}%")
+
+    # Flatten the forest for the NumPy inference engine and make sure it agrees with sklearn
+    compiled = export_forest(pipe)
+    same = np.array_equal(CompiledForest(compiled).predict_proba(x_test), pipe.predict_proba(x_test))
+    print(f"Compiled engine matches sklearn: {same}")
+
+    # Save model + metadata (feature order) for safe reuse
+    bundle: Dict = {
+        "model": pipe,
+        "compiled": compiled,
+        "features": FEATURES,
+        "test_accuracy": acc,
+    }
+    if search is not None:
+        bundle["search"] = search
+    bundle["training"] = {"mode": "in-memory", "balance": args.balance}
+    # Reference distribution for drift monitoring: the raw rows, before imputation and upsampling
+    raw = load_dataset(args.csv, report=None).drop(columns=TARGET).to_numpy(dtype=float)
+    bundle["reference"] = reference_profile(raw, FEATURES)
+    if has_optimizations(args) or args.optimize_report:
+        bundle = apply_optimizations(bundle, args, x_train, y_train, x_test, y_test)
+        if "optimizations" in bundle:
+            bundle["test_accuracy"] = float(np.mean(bundle["model"].predict(x_test) == y_test))
+            print(f"Optimized Test Accuracy: {bundle['test_accuracy'] * 100:.2f}%")
+    save_bundle(add_inference_extras(bundle, x_train), args.format)
+
+
+if __name__ == "__main__":
+    main()
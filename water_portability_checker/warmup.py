@@ -0,0 +1,111 @@
+import importlib
+import os
+import threading
+import time
+
+# ------------------------------
+# Background warm-up for the Streamlit apps
+# ------------------------------
+# Only streamlit and this module (stdlib only) are imported before the page
+# shell is drawn. The heavy modules and the model bundle are loaded by one
+# daemon thread per server process; the apps keep the Predict button disabled
+# and rerun until it is done. Later sessions find everything already loaded.
+# POTABILITY_EAGER_START=1 restores the old blocking start.
+
+# Imported in this order; the bundle load (which pulls in sklearn for pickle
+# bundles) comes last
+HEAVY_MODULES = [
+    "numpy",
+    "pandas",
+    "joblib",
+    "forest_engine",
+    "bundle_io",
+    "model_registry",
+    "batch_scoring",
+    "rules",
+    "prediction_cache",
+    "instrumentation",
+    "attributions",
+    "forest_optimize",
+    "drift_monitor",
+]
+
+EAGER_START = os.environ.get("POTABILITY_EAGER_START") == "1"
+
+
+class Warmup:
+    """Imports HEAVY_MODULES, then loads the newest bundle into the model registry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.steps = []        # [(step, seconds)] in completion order
+        self.current = None    # step in progress
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.model_path = None
+
+    def start(self, base_dir: str, modules=None):
+        """Idempotent: the first call in the process starts the thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(
+                target=self._run, args=(base_dir, list(modules or HEAVY_MODULES)),
+                name="potability-warmup", daemon=True,
+            )
+            self._thread.start()
+
+    def _step(self, name, fn):
+        self.current = name
+        t0 = time.perf_counter()
+        result = fn()
+        self.steps.append((name, time.perf_counter() - t0))
+        return result
+
+    def _run(self, base_dir, modules):
+        try:
+            for name in modules:
+                self._step(f"import {name}", lambda: importlib.import_module(name))
+            from bundle_io import resolve_model_path
+            from model_registry import get_bundle
+
+            self.model_path = resolve_model_path(base_dir)
+            # A missing model is reported by the app itself once the gate opens
+            if os.path.exists(self.model_path):
+                self._step("load model", lambda: get_bundle(self.model_path))
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.current = None
+            self.finished_at = time.perf_counter()
+            self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def status(self) -> str:
+        if self.done:
+            return f"Ready in {self.elapsed:.1f} s" if self.error is None else f"Warm-up failed: {self.error}"
+        step = self.current or "starting"
+        return f"Warming up ({step}, {self.elapsed:.1f} s)... Predict is enabled once the model is loaded."
+
+
+_warmup = Warmup()
+
+
+def get_warmup() -> Warmup:
+    return _warmup
@@ -1,9 +1,7 @@
 import streamlit as st
-import numpy as np
-import joblib
 import os
 
-MODEL_FILE_NAME = "water_potability_rf.pkl"
+from warmup import EAGER_START, get_warmup
 
 st.set_page_config(page_title="Water Potability Checker", page_icon="🚰", layout="centered")
 
@@ -12,108 +10,136 @@ st.title("🚰 Water Potability Checker By Khizar Shujaat")
 # Get the directory where this script lives
 BASE_DIR = os.path.dirname(__file__)
 
-# Point to the pkl file in the same folder
-MODEL_PATH = os.path.join(BASE_DIR, MODEL_FILE_NAME)
+# --- Input form (Predict is disabled until the model is ready) ---
+def input_form(ready):
+    with st.form("water_form", clear_on_submit=False):
+        col1, col2 = st.columns(2)
+        ## Values for Water is not Potable, Potability Value: 1.000000, Record Number 313
+        with col1:
+            ph = st.number_input("pH", min_value=0.0, max_value=14.0, value=5.862641, step=0.000001, format="%.6f", help="Recommended 0.0–14.0")
+            hardness = st.number_input("Hardness", min_value=0.0, value=185.065220, step=0.000001, format="%.6f", help="Typically ≤ 400")
+            solids = st.number_input("Solids", min_value=0.0, value=44069.272158, step=0.000001, format="%.6f", help="Typically ≤ 100000")
+            chloramines = st.number_input("Chloramines", min_value=0.0, value=4.382721, step=0.000001, format="%.6f", help="Typically ≤ 100")
+            sulfate = st.number_input("Sulfate", min_value=0.0, value=412.690111, step=0.000001, format="%.6f", help="Typically ≤ 1000")
+        with col2:
+            conductivity = st.number_input("Conductivity", min_value=0.0, value=331.570139, step=0.000001, format="%.6f", help="Typically ≤ 1000")
+            organic_carbon = st.number_input("Organic Carbon", min_value=0.0, value=15.306079, step=0.000001, format="%.6f", help="Typically ≤ 100")
+            trihalomethanes = st.number_input("Trihalomethanes", min_value=0.0, value=59.605812, step=0.000001, format="%.6f", help="Typically ≤ 1000")
+            turbidity = st.number_input("Turbidity", min_value=0.0, value=5.507421, step=0.000001, format="%.6f", help="Typically ≤ 100")
+
+        ## Values for Water is Potable, Portability Value: 0.000000, Record Number 3
+        # with col1:
+        #     ph = st.number_input("pH", min_value=0.0, max_value=14.0, value=8.316766, step=0.000001, format="%.6f", help="Recommended 0.0–14.0")
+        #     hardness = st.number_input("Hardness", min_value=0.0, value=214.373394, step=0.000001, format="%.6f", help="Typically ≤ 400")
+        #     solids = st.number_input("Solids", min_value=0.0, value=22018.417441, step=0.000001, format="%.6f", help="Typically ≤ 100000")
+        #     chloramines = st.number_input("Chloramines", min_value=0.0, value=8.059332, step=0.000001, format="%.6f", help="Typically ≤ 100")
+        #     sulfate = st.number_input("Sulfate", min_value=0.0, value=356.886136, step=0.000001, format="%.6f", help="Typically ≤ 1000")
+        # with col2:
+        #     conductivity = st.number_input("Conductivity", min_value=0.0, value=363.266516, step=0.000001, format="%.6f", help="Typically ≤ 1000")
+        #     organic_carbon = st.number_input("Organic Carbon", min_value=0.0, value=18.436524, step=0.000001, format="%.6f", help="Typically ≤ 100")
+        #     trihalomethanes = st.number_input("Trihalomethanes", min_value=0.0, value=100.341674, step=0.000001, format="%.6f", help="Typically ≤ 1000")
+        #     turbidity = st.number_input("Turbidity", min_value=0.0, value=4.916218, step=4.628771, format="%.6f", help="Typically ≤ 100")
+
+        c1, c2, c3 = st.columns([1, 1, 1])
+        with c2:
+            submitted = st.form_submit_button("Predict", use_container_width=True, disabled=not ready)
+    return submitted, {
+        "pH": ph,
+        "Hardness": hardness,
+        "Solids": solids,
+        "Chloramines": chloramines,
+        "Sulfate": sulfate,
+        "Conductivity": conductivity,
+        "Organic Carbon": organic_carbon,
+        "Trihalomethanes": trihalomethanes,
+        "Turbidity": turbidity,
+    }
+
+# Cold start: show the page right away; heavy imports and the model load run in a background thread
+warmup = get_warmup()
+warmup.start(BASE_DIR)
+if EAGER_START:
+    warmup.wait()
+if not warmup.done:
+    st.info(warmup.status())
+    input_form(ready=False)
+    warmup.wait(0.5)
+    st.rerun()
+
+# Already imported by the warm-up thread
+import numpy as np
+
+from bundle_io import resolve_model_path
+from drift_monitor import DriftMonitor
+from forest_engine import compiled_from_bundle
+from forest_optimize import describe_optimizations
+from model_registry import get_bundle
+from rules import get_rules
+
+# Point to the model bundle in the same folder (mmap directory if it is the newest, else the .pkl)
+MODEL_PATH = resolve_model_path(BASE_DIR)
 
 # Load model bundle
 if not os.path.exists(MODEL_PATH):
     st.error(f"Model file not found: {MODEL_PATH}. Please run `python train_model.py` first.")
     st.stop()
 
-bundle = joblib.load(MODEL_PATH)
+# Loaded once per server process and shared by every session/rerun
+loaded = get_bundle(MODEL_PATH)
+bundle = loaded.bundle
 model = bundle["model"]
 FEATURES = bundle["features"]
 test_acc = bundle.get("test_accuracy", None)
 
+# Inference engine: compiled NumPy forest (same outputs, far less per-call overhead) or sklearn
+# (mmap and optimized bundles carry only the compiled arrays)
+compiled_only = bundle.get("format", "").startswith("mmap") or bundle.get("optimizations")
+engines = ["Compiled NumPy"] if compiled_only else ["Compiled NumPy", "scikit-learn"]
+engine = st.sidebar.radio("Inference engine", engines)
+if engine == "Compiled NumPy":
+    predictor = loaded.derived("compiled", compiled_from_bundle)
+else:
+    predictor = model
+
 if test_acc is not None:
     st.caption(f"Loaded model • Test accuracy at train time: **{test_acc:.4f}**")
+optimized = describe_optimizations(bundle.get("optimizations"))
+if optimized:
+    st.caption(f"Optimized forest: {optimized}")
+st.caption(
+    f"Model version {loaded.version} • loaded once in {loaded.load_seconds * 1000:.0f} ms, "
+    f"{loaded.memory_bytes / 2**20:.1f} MiB (shared across reruns)"
+)
 
 st.write("Enter the measurements and click **Predict** to see if the water is likely potable.")
 
-# --- Input form ---
-with st.form("water_form", clear_on_submit=False):
-    col1, col2 = st.columns(2)
-    ## Values for Water is not Potable, Potability Value: 1.000000, Record Number 313
-    with col1:
-        ph = st.number_input("pH", min_value=0.0, max_value=14.0, value=5.862641, step=0.000001, format="%.6f", help="Recommended 0.0–14.0")
-        hardness = st.number_input("Hardness", min_value=0.0, value=185.065220, step=0.000001, format="%.6f", help="Typically ≤ 400")
-        solids = st.number_input("Solids", min_value=0.0, value=44069.272158, step=0.000001, format="%.6f", help="Typically ≤ 100000")
-        chloramines = st.number_input("Chloramines", min_value=0.0, value=4.382721, step=0.000001, format="%.6f", help="Typically ≤ 100")
-        sulfate = st.number_input("Sulfate", min_value=0.0, value=412.690111, step=0.000001, format="%.6f", help="Typically ≤ 1000")
-    with col2:
-        conductivity = st.number_input("Conductivity", min_value=0.0, value=331.570139, step=0.000001, format="%.6f", help="Typically ≤ 1000")
-        organic_carbon = st.number_input("Organic Carbon", min_value=0.0, value=15.306079, step=0.000001, format="%.6f", help="Typically ≤ 100")
-        trihalomethanes = st.number_input("Trihalomethanes", min_value=0.0, value=59.605812, step=0.000001, format="%.6f", help="Typically ≤ 1000")
-        turbidity = st.number_input("Turbidity", min_value=0.0, value=5.507421, step=0.000001, format="%.6f", help="Typically ≤ 100")
-
-    ## Values for Water is Potable, Portability Value: 0.000000, Record Number 3
-    # with col1:
-    #     ph = st.number_input("pH", min_value=0.0, max_value=14.0, value=8.316766, step=0.000001, format="%.6f", help="Recommended 0.0–14.0")
-    #     hardness = st.number_input("Hardness", min_value=0.0, value=214.373394, step=0.000001, format="%.6f", help="Typically ≤ 400")
-    #     solids = st.number_input("Solids", min_value=0.0, value=22018.417441, step=0.000001, format="%.6f", help="Typically ≤ 100000")
-    #     chloramines = st.number_input("Chloramines", min_value=0.0, value=8.059332, step=0.000001, format="%.6f", help="Typically ≤ 100")
-    #     sulfate = st.number_input("Sulfate", min_value=0.0, value=356.886136, step=0.000001, format="%.6f", help="Typically ≤ 1000")
-    # with col2:
-    #     conductivity = st.number_input("Conductivity", min_value=0.0, value=363.266516, step=0.000001, format="%.6f", help="Typically ≤ 1000")
-    #     organic_carbon = st.number_input("Organic Carbon", min_value=0.0, value=18.436524, step=0.000001, format="%.6f", help="Typically ≤ 100")
-    #     trihalomethanes = st.number_input("Trihalomethanes", min_value=0.0, value=100.341674, step=0.000001, format="%.6f", help="Typically ≤ 1000")
-    #     turbidity = st.number_input("Turbidity", min_value=0.0, value=4.916218, step=4.628771, format="%.6f", help="Typically ≤ 100")
-
-    c1, c2, c3 = st.columns([1, 1, 1])
-    with c2:
-        submitted = st.form_submit_button("Predict", use_container_width=True)
-
-# --- Rule thresholds (adjust as needed) ---
-THRESHOLDS = {
-    "pH": (0.0, 14.0),
-    "Hardness": (0, 400),
-    "Solids": (0, 100000),
-    "Chloramines": (0, 100),
-    "Sulfate": (0, 1000),
-    "Conductivity": (0, 1000),
-    "Organic Carbon": (0, 100),
-    "Trihalomethanes": (0, 1000),
-    "Turbidity": (0, 100),
-}
-
-def check_range(value, lo, hi):
-    return lo <= value <= hi
+submitted, inputs = input_form(ready=True)
+
+# Running input statistics vs the training reference; periodically written to potability_drift.json
+drift = loaded.derived("drift", DriftMonitor.from_bundle)
+
+# --- Rule thresholds: potability_rules.json (edit the file to adjust) ---
+RULES = get_rules(FEATURES)
 
 def evaluate_potability(inputs):
-    checks = {
-        "pH": check_range(inputs["pH"], *THRESHOLDS["pH"]),
-        "Hardness": check_range(inputs["Hardness"], *THRESHOLDS["Hardness"]),
-        "Solids": check_range(inputs["Solids"], *THRESHOLDS["Solids"]),
-        "Chloramines": check_range(inputs["Chloramines"], *THRESHOLDS["Chloramines"]),
-        "Sulfate": check_range(inputs["Sulfate"], *THRESHOLDS["Sulfate"]),
-        "Conductivity": check_range(inputs["Conductivity"], *THRESHOLDS["Conductivity"]),
-        "Organic Carbon": check_range(inputs["Organic Carbon"], *THRESHOLDS["Organic Carbon"]),
-        "Trihalomethanes": check_range(inputs["Trihalomethanes"], *THRESHOLDS["Trihalomethanes"]),
-        "Turbidity": check_range(inputs["Turbidity"], *THRESHOLDS["Turbidity"]),
-    }
     values = [
         inputs["pH"], inputs["Hardness"], inputs["Solids"], inputs["Chloramines"], inputs["Sulfate"],
         inputs["Conductivity"], inputs["Organic Carbon"], inputs["Trihalomethanes"], inputs["Turbidity"]
     ]
     X = np.array([values], dtype=float)
+    if drift is not None:
+        drift.update(X)
+        drift.export(model_version=loaded.version)
+
+    # All nine range checks in one broadcasted comparison
+    checks = RULES.describe(X[0])
 
-    pred = model.predict(X)[0]
+    pred = predictor.predict(X)[0]
 
     return pred, checks
 
 if submitted:
     with st.spinner("Evaluating water quality..."):
-        inputs = {
-            "pH": ph,
-            "Hardness": hardness,
-            "Solids": solids,
-            "Chloramines": chloramines,
-            "Sulfate": sulfate,
-            "Conductivity": conductivity,
-            "Organic Carbon": organic_carbon,
-            "Trihalomethanes": trihalomethanes,
-            "Turbidity": turbidity,
-        }
         prediction_result, checks = evaluate_potability(inputs)
 
     if prediction_result == 1:
@@ -122,7 +148,6 @@ if submitted:
         st.error("❌ Water is **Not Potable**")
 
     with st.expander("See parameter-by-parameter checks"):
-        for name, ok in checks.items():
-            rng = THRESHOLDS[name] if name != "Trihalomethanes" else THRESHOLDS["Trihalomethanes"]
+        for name, value, lo, hi, ok in checks:
             badge = "✅ OK" if ok else "⚠️ Out of range"
-            st.write(f"- **{name}**: {inputs[name]} (target: {rng[0]}–{rng[1]}) {badge}")
+            st.write(f"- **{name}**: {value} (target: {lo}–{hi}) {badge}")
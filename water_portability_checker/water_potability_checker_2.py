@@ -1,9 +1,10 @@
-import streamlit as st
-import numpy as np
-import joblib
 import os
+import tempfile
+import weakref
 
-MODEL_FILE_NAME = "water_potability_rf.pkl"
+import streamlit as st
+
+from warmup import EAGER_START, get_warmup
 
 st.set_page_config(page_title="Water Potability Checker", page_icon="🚰", layout="wide")
 st.markdown(
@@ -15,71 +16,209 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+BASE_DIR = os.path.dirname(__file__)
+
 # ------------------------------
-# Load model bundle (.pkl)
+# Input form (shared by the warm-up shell and the ready page)
 # ------------------------------
-BASE_DIR = os.path.dirname(__file__)
-MODEL_PATH = os.path.join(BASE_DIR, MODEL_FILE_NAME)
+def input_form(ready: bool):
+    """Measurement form; Predict stays disabled until the warm-up is done. Returns (submitted, inputs)."""
+    with st.form("water_form", clear_on_submit=False):
+        col1, col2 = st.columns(2)
+
+        # --- Example defaults (you can change them) ---
+        with col1:
+            ph = st.number_input("pH", min_value=0.0, max_value=14.0,
+                                 value=5.862641, step=0.000001, format="%.6f", help="0.000000–14.000000")
+            hardness = st.number_input("Hardness", min_value=0.0,
+                                       value=185.065220, step=0.000001, format="%.6f")
+            solids = st.number_input("Solids", min_value=0.0,
+                                     value=44069.272158, step=0.000001, format="%.6f")
+            chloramines = st.number_input("Chloramines", min_value=0.0,
+                                          value=4.382721, step=0.000001, format="%.6f")
+            sulfate = st.number_input("Sulfate", min_value=0.0,
+                                      value=412.690111, step=0.000001, format="%.6f")
+        with col2:
+            conductivity = st.number_input("Conductivity", min_value=0.0,
+                                           value=331.570139, step=0.000001, format="%.6f")
+            organic_carbon = st.number_input("Organic Carbon", min_value=0.0,
+                                             value=15.306079, step=0.000001, format="%.6f")
+            trihalomethanes = st.number_input("Trihalomethanes", min_value=0.0,
+                                              value=59.605812, step=0.000001, format="%.6f")
+            turbidity = st.number_input("Turbidity", min_value=0.0,
+                                        value=5.507421, step=0.000001, format="%.6f")
+
+        # Centered Predict button
+        c1, c2, c3 = st.columns([1, 1, 1])
+        with c2:
+            submitted = st.form_submit_button("Predict", use_container_width=True, disabled=not ready)
+    return submitted, {
+        "pH": ph,
+        "Hardness": hardness,
+        "Solids": solids,
+        "Chloramines": chloramines,
+        "Sulfate": sulfate,
+        "Conductivity": conductivity,
+        "Organic Carbon": organic_carbon,
+        "Trihalomethanes": trihalomethanes,
+        "Turbidity": turbidity,
+    }
+
+
+# ------------------------------
+# Cold start: draw the page shell now, import heavy modules and load the model in the background
+# ------------------------------
+warmup = get_warmup()
+warmup.start(BASE_DIR)
+if EAGER_START:
+    warmup.wait()
+if not warmup.done:
+    left, right = st.columns([1.3, 1])
+    with left:
+        st.subheader("Inputs")
+        input_form(ready=False)
+    with right:
+        st.subheader("Result")
+        st.info(warmup.status())
+    warmup.wait(0.5)
+    st.rerun()
+
+# Already imported by the warm-up thread: these are sys.modules lookups now
+import numpy as np
+from attributions import explainer_from_bundle
+from batch_scoring import get_final_estimator, predict_with_proba, score_csv_to_file
+from bundle_io import resolve_model_path
+from drift_monitor import DRIFT_PATH, DriftMonitor
+from feature_schema import UI_TO_FEATURE
+from forest_engine import compiled_from_bundle
+from forest_optimize import describe_optimizations
+from instrumentation import METRICS_PATH, get_recorder
+from model_registry import get_bundle
+from prediction_cache import get_cache, quantize
+from rules import get_rules
+
+# ------------------------------
+# Diagnostics: per-stage timing spans (no-op recorder when off)
+# ------------------------------
+diagnostics = st.sidebar.toggle(
+    "Diagnostics", value=os.environ.get("POTABILITY_DIAGNOSTICS") == "1",
+    help=f"Time each stage of the prediction path; also writes Prometheus metrics to {METRICS_PATH}",
+)
+recorder = get_recorder(diagnostics)
+
+def render_diagnostics():
+    if not diagnostics:
+        return
+    rows = [
+        {"stage": stage, "n": n, "p50 ms": p50 * 1000, "p90 ms": p90 * 1000, "p99 ms": p99 * 1000, "mean ms": mean * 1000}
+        for stage, n, p50, p90, p99, mean in recorder.summary()
+    ]
+    st.sidebar.subheader("Stage latency")
+    if rows:
+        st.sidebar.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.sidebar.caption("No spans recorded yet.")
+    try:
+        recorder.export()
+    except OSError as e:
+        st.sidebar.caption(f"Metrics export failed: {e}")
+
+# ------------------------------
+# Load model bundle (.pkl or mmap directory)
+# ------------------------------
+MODEL_PATH = resolve_model_path(BASE_DIR)  # mmap bundle dir if newest, else the .pkl
 
 if not os.path.exists(MODEL_PATH):
     st.error(f"Model file not found: {MODEL_PATH}. Please run `python train_model.py` first.")
     st.stop()
 
-bundle = joblib.load(MODEL_PATH)
+# Loaded once per server process and shared by every session/rerun
+with recorder.span("model_load"):
+    loaded = get_bundle(MODEL_PATH)
+bundle = loaded.bundle
 model = bundle["model"]
 FEATURES = bundle["features"]  # training feature order (lowercase)
 test_acc = bundle.get("test_accuracy", None)
 
-# Helper: get final estimator name and classes
-def get_final_estimator(m):
-    if hasattr(m, "steps"):  # Pipeline
-        return m.steps[-1][1]
-    return m
-
+# Helper: get final estimator name
 def get_model_name(m):
     est = get_final_estimator(m)
     return est.__class__.__name__
 
+# ------------------------------
+# Inference engine
+# ------------------------------
+ENGINES = ["Compiled NumPy", "scikit-learn"]
+if bundle.get("format", "").startswith("mmap") or bundle.get("optimizations"):
+    ENGINES = ENGINES[:1]  # mmap and optimized bundles carry only the compiled arrays
+engine = st.sidebar.radio(
+    "Inference engine", ENGINES,
+    help="Compiled NumPy walks the flattened forest arrays directly; results are identical to scikit-learn.",
+)
+if engine == "Compiled NumPy":
+    predictor = loaded.derived("compiled", compiled_from_bundle)
+else:
+    predictor = model
+
 # ------------------------------
 # KPI Metrics Row
 # ------------------------------
-m1, m2, m3 = st.columns(3)
+prediction_cache = get_cache()
+
+m1, m2, m3, m4 = st.columns(4)
 m1.metric("Test Accuracy", f"{test_acc:.2%}" if test_acc is not None else "—")
-m2.metric("Features", f"{len(FEATURES)}")
-m3.metric("Model", get_model_name(model))
+cache_slot = m2.empty()
+m3.metric("Features", f"{len(FEATURES)}")
+optimized = describe_optimizations(bundle.get("optimizations"))
+m4.metric("Model", get_model_name(model) + (f" ({optimized})" if optimized else ""),
+          help=f"Post-training optimizations: {optimized}" if optimized else None)
+
+def show_cache_stats():
+    stats = prediction_cache.stats()
+    cache_slot.metric(
+        "Cache hit / miss / evict",
+        f"{stats['hits']} / {stats['misses']} / {stats['evictions']}",
+        help=f"{stats['size']}/{stats['maxsize']} entries • {stats['expirations']} expired • "
+             f"{stats['invalidations']} model-change invalidations",
+    )
+
+show_cache_stats()
+
+# Input drift: running per-feature statistics vs the training reference (none for older bundles)
+drift = loaded.derived("drift", DriftMonitor.from_bundle)
+
+def render_drift():
+    if drift is None:
+        return
+    with st.sidebar.expander("Input drift", expanded=False):
+        if not drift.rows:
+            st.caption("No samples scored yet.")
+            return
+        rows = [
+            {"feature": r["feature"], "n": r["n"], "shift σ": r["shift"], "PSI": r["psi"], "status": r["status"]}
+            for r in drift.scores()
+        ]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"{drift.rows:,} samples since model load • PSI ≥ 0.1 watch, ≥ 0.25 drift • "
+                   f"written to {DRIFT_PATH}")
+    try:
+        drift.export(model_version=loaded.version)
+    except OSError as e:
+        st.sidebar.caption(f"Drift export failed: {e}")
+
+st.caption(
+    f"Model version {loaded.version} • loaded once in {loaded.load_seconds * 1000:.0f} ms, "
+    f"{loaded.memory_bytes / 2**20:.1f} MiB (shared across reruns) • "
+    f"process warm-up {warmup.elapsed:.1f} s"
+)
 
 st.write("Enter the measurements and click **Predict** to see if the water is likely potable.")
 
 # ------------------------------
-# Thresholds for quick rule-check panel (cosmetic guidance)
-# ------------------------------
-THRESHOLDS = {
-    "pH": (0.0, 14.0),
-    "Hardness": (0, 400),
-    "Solids": (0, 100000),
-    "Chloramines": (0, 100),
-    "Sulfate": (0, 1000),
-    "Conductivity": (0, 1000),
-    "Organic Carbon": (0, 100),
-    "Trihalomethanes": (0, 1000),
-    "Turbidity": (0, 100),
-}
-
-# Map UI keys -> training feature names
-UI_TO_FEATURE = {
-    "pH": "ph",
-    "Hardness": "hardness",
-    "Solids": "solids",
-    "Chloramines": "chloramines",
-    "Sulfate": "sulfate",
-    "Conductivity": "conductivity",
-    "Organic Carbon": "organic_carbon",
-    "Trihalomethanes": "trihalomethanes",
-    "Turbidity": "turbidity",
-}
-
-def check_range(value, lo, hi):
-    return lo <= value <= hi
+# Rules for quick rule-check panel (cosmetic guidance)
+# Thresholds live in potability_rules.json and are picked up when the file changes
+# ------------------------------
+RULES = get_rules(FEATURES)
 
 def verdict_banner(container, pred: int, prob: float | None):
     if pred == 1:
@@ -99,35 +238,120 @@ def verdict_banner(container, pred: int, prob: float | None):
 def evaluate(inputs: dict):
     """
     inputs: dict with UI keys (e.g., 'pH', 'Hardness', ...)
-    Returns: pred, prob, checks(dict), values_by_feature(dict in training order)
+    Returns: pred, prob, checks(list of (name, value, lo, hi, ok)), values_by_feature(dict in training order)
     """
-    # Rule checks
-    checks = {k: check_range(inputs[k], *THRESHOLDS[k]) for k in THRESHOLDS.keys()}
-
     # Build feature vector in training order
-    feature_dict = {UI_TO_FEATURE[k]: float(v) for k, v in inputs.items()}
-    values = [feature_dict[f] for f in FEATURES]
-    X = np.array([values], dtype=float)
-
-    # Prediction + probability
-    pred = int(model.predict(X)[0])
-    prob = None
-    if hasattr(model, "predict_proba"):
-        proba_row = model.predict_proba(X)[0]
-        est = get_final_estimator(model)
-        try:
-            classes = list(est.classes_)
-            if 1 in classes:
-                idx = classes.index(1)
-                prob = float(proba_row[idx])  # P(class=1 -> potable)
-            else:
-                # fallback: assume positive class is the second column
-                prob = float(proba_row[-1])
-        except Exception:
-            prob = None
+    with recorder.span("build_features"):
+        feature_dict = {UI_TO_FEATURE[k]: float(v) for k, v in inputs.items()}
+        values = [feature_dict[f] for f in FEATURES]
+        X = np.array([values], dtype=float)
+
+    if drift is not None:
+        drift.update(X)  # aggregates only; the sample itself is not kept
+
+    # Rule checks: one broadcasted comparison over all rules
+    with recorder.span("rule_checks"):
+        checks = RULES.describe(X[0])
+
+    # Prediction + probability (P(class=1 -> potable)) from a single model call,
+    # skipped entirely when this sample (to 6 decimals) was scored by this model before
+    def compute():
+        with recorder.span("predict"):
+            preds, probs = predict_with_proba(predictor, X)
+        return int(preds[0]), float(probs[0])
+
+    with recorder.span("cache_and_predict"):
+        pred, prob = prediction_cache.get_or_compute(loaded.version, (engine, quantize(values)), compute)
 
     return pred, prob, checks, dict(zip(FEATURES, values))
 
+# ------------------------------
+# Per-session batch results file
+# ------------------------------
+class _SessionFile:
+    """Owns a temp file; it is removed when the session's state is dropped or the server exits."""
+
+    def __init__(self, suffix: str):
+        fd, self.path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        weakref.finalize(self, _remove_file, self.path)
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def session_results_path() -> str:
+    """One results file per session, reused by every batch run."""
+    if "batch_results_file" not in st.session_state:
+        st.session_state.batch_results_file = _SessionFile(".csv")
+    return st.session_state.batch_results_file.path
+
+# ------------------------------
+# Mode: single sample form or batch CSV upload
+# ------------------------------
+mode = st.radio("Mode", ["Single sample", "Batch CSV"], horizontal=True)
+
+if mode == "Batch CSV":
+    st.subheader("Batch scoring")
+    st.write(
+        "Upload a CSV with the nine measurement columns "
+        f"({', '.join(FEATURES)}; header case does not matter). "
+        "Rows are scored in chunks with one model call per chunk."
+    )
+    uploaded = st.file_uploader("Samples CSV", type=["csv"])
+    with_contrib = st.checkbox(
+        "Add per-feature SHAP value columns", value=False,
+        help="Exact TreeSHAP for every row; adds about 5 ms per row (close to a minute per 10,000 rows)",
+    )
+    # Batch only: on a handful of rows the extra passes cost more than the skipped trees
+    early_exit = engine == "Compiled NumPy" and st.checkbox(
+        "Early-exit voting", value=False,
+        help="Stop walking trees once the remaining ones cannot change the majority vote. "
+             "Same verdicts, fewer trees; pays off from a few hundred rows. "
+             "Writes trees_evaluated instead of potable_prob.",
+    )
+    if uploaded is not None and st.button("Score file", type="primary"):
+        progress_bar = st.progress(0.0, text="Scoring...")
+        # Results go chunk by chunk to this session's temporary file, overwriting the previous run
+        results_path = session_results_path()
+        try:
+            with recorder.span("batch_score"), open(results_path, "w", encoding="utf-8", newline="") as out:
+                n_rows, seconds, head = score_csv_to_file(
+                    predictor, uploaded, out, FEATURES, RULES,
+                    progress=lambda frac: progress_bar.progress(frac, text=f"Scoring... {frac:.0%}"),
+                    explainer=loaded.derived("explainer", explainer_from_bundle) if with_contrib else None,
+                    monitor=drift, early_exit=early_exit,
+                )
+        except ValueError as e:
+            progress_bar.empty()
+            st.error(str(e))
+            st.stop()
+        progress_bar.progress(1.0, text="Done")
+
+        b1, b2, b3 = st.columns(3)
+        b1.metric("Rows scored", f"{n_rows:,}")
+        b2.metric("Throughput", f"{n_rows / seconds:,.0f} rows/s" if seconds > 0 else "—")
+        b3.metric("Time", f"{seconds:.2f} s")
+        if head is not None:
+            st.dataframe(head, use_container_width=True)
+
+        def read_results(path=results_path):
+            # Called only when the button is clicked, so the file is not kept in session memory
+            with open(path, "rb") as f:
+                return f.read()
+
+        st.download_button(
+            "Download results CSV", data=read_results,
+            file_name="potability_results.csv", mime="text/csv",
+        )
+    render_drift()
+    render_diagnostics()
+    st.stop()
+
 # ------------------------------
 # Two-column layout
 # ------------------------------
@@ -135,35 +359,7 @@ left, right = st.columns([1.3, 1])
 
 with left:
     st.subheader("Inputs")
-    with st.form("water_form", clear_on_submit=False):
-        col1, col2 = st.columns(2)
-
-        # --- Example defaults (you can change them) ---
-        with col1:
-            ph = st.number_input("pH", min_value=0.0, max_value=14.0,
-                                 value=5.862641, step=0.000001, format="%.6f", help="0.000000–14.000000")
-            hardness = st.number_input("Hardness", min_value=0.0,
-                                       value=185.065220, step=0.000001, format="%.6f")
-            solids = st.number_input("Solids", min_value=0.0,
-                                     value=44069.272158, step=0.000001, format="%.6f")
-            chloramines = st.number_input("Chloramines", min_value=0.0,
-                                          value=4.382721, step=0.000001, format="%.6f")
-            sulfate = st.number_input("Sulfate", min_value=0.0,
-                                      value=412.690111, step=0.000001, format="%.6f")
-        with col2:
-            conductivity = st.number_input("Conductivity", min_value=0.0,
-                                           value=331.570139, step=0.000001, format="%.6f")
-            organic_carbon = st.number_input("Organic Carbon", min_value=0.0,
-                                             value=15.306079, step=0.000001, format="%.6f")
-            trihalomethanes = st.number_input("Trihalomethanes", min_value=0.0,
-                                              value=59.605812, step=0.000001, format="%.6f")
-            turbidity = st.number_input("Turbidity", min_value=0.0,
-                                        value=5.507421, step=0.000001, format="%.6f")
-
-        # Centered Predict button
-        c1, c2, c3 = st.columns([1, 1, 1])
-        with c2:
-            submitted = st.form_submit_button("Predict", use_container_width=True)
+    submitted, user_inputs = input_form(ready=True)
 
 # Prepare containers on the right so they don't jump around
 with right:
@@ -176,41 +372,52 @@ with right:
 # On submit: compute + render
 # ------------------------------
 if submitted:
-    user_inputs = {
-        "pH": ph,
-        "Hardness": hardness,
-        "Solids": solids,
-        "Chloramines": chloramines,
-        "Sulfate": sulfate,
-        "Conductivity": conductivity,
-        "Organic Carbon": organic_carbon,
-        "Trihalomethanes": trihalomethanes,
-        "Turbidity": turbidity,
-    }
-
     with st.spinner("Evaluating water quality..."):
         pred, prob, checks, values_by_feature = evaluate(user_inputs)
+    show_cache_stats()
 
     # Verdict banner + metrics on the right
     with right:
-        verdict_banner(verdict_placeholder, pred, prob)
+        with recorder.span("render_verdict"):
+            verdict_banner(verdict_placeholder, pred, prob)
 
         # Small KPI row specific to this prediction
         cA, _ = metrics_row.columns(2)
-        passed = sum(checks.values())
-        cA.metric("Checks Passed", f"{passed}/9")
+        passed = sum(ok for *_, ok in checks)
+        cA.metric("Checks Passed", f"{passed}/{len(checks)}")
         # if prob is not None:
         #     cB.metric("Potability Prob.", f"{prob:.6f}")
         # else:
         #     cB.metric("Potability Prob.", "—")
 
+        # TreeSHAP: how much each measurement moved P(potable) away from the average
+        with recorder.span("attributions"):
+            try:
+                explainer = loaded.derived("explainer", explainer_from_bundle)
+                contrib = explainer.explain([list(values_by_feature.values())])[0]  # training feature order
+            except ValueError:  # bundle saved before TreeSHAP, without node covers
+                explainer = contrib = None
+
         # Detailed checks
         with checks_expander:
-            for name, ok in checks.items():
-                lo, hi = THRESHOLDS[name]
+            for (name, value, lo, hi, ok), column in zip(checks, RULES.columns):
                 badge = "✅ OK" if ok else "⚠️ Out of range"
-                st.write(f"- **{name}**: {user_inputs[name]:.6f} (target: {lo}–{hi}) {badge}")
+                impact = ""
+                if contrib is not None:
+                    c = contrib[column]
+                    impact = f" • SHAP {'+' if c >= 0 else '−'}{abs(c):.3f}"
+                st.write(f"- **{name}**: {value:.6f} (target: {lo}–{hi}) {badge}{impact}")
+            if contrib is not None:
+                st.caption(
+                    f"SHAP: each measurement's exact Shapley share (path-dependent TreeSHAP) of how far "
+                    f"P(potable) moved from the model's average {explainer.bias:.3f}."
+                )
+            else:
+                st.caption("Retrain with train_model.py to see SHAP values for this model.")
 
 else:
     with right:
         st.info("Fill the inputs on the left and click **Predict** to see the result.")
+
+render_diagnostics()
+render_drift()